@@ -0,0 +1,610 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import threading
+import traceback
+from collections import deque
+import numpy as np
+
+from tracing import get_tracer
+
+
+SAMPLE_RATE = 16000
+SAMPLE_FORMATS = {'s16le': np.int16, 'f32le': np.float32}
+
+
+class StreamResampler:
+    """Stateful sample-rate converter for audio that arrives in pieces
+
+    Uses soxr's streaming resampler when it is installed, otherwise linear
+    interpolation that carries its phase and last sample across calls, so
+    block boundaries do not click.
+    """
+
+    def __init__(self, source_rate, target_rate=SAMPLE_RATE):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self._soxr = None
+        self._position = 0.0
+        self._last = None
+        if source_rate != target_rate:
+            try:
+                import soxr
+                self._soxr = soxr.ResampleStream(source_rate, target_rate, 1, dtype='float32')
+            except ImportError:
+                pass
+
+    def process(self, samples, last=False):
+        if self.source_rate == self.target_rate:
+            return samples
+        if self._soxr is not None:
+            return self._soxr.resample_chunk(samples, last=last)
+
+        if self._last is not None:
+            samples = np.concatenate([[self._last], samples])
+        if len(samples) < 2:
+            if len(samples):
+                self._last = samples[-1]
+            return np.zeros(0, dtype=np.float32)
+        step = self.source_rate / self.target_rate
+        positions = np.arange(self._position, len(samples) - 1, step)
+        output = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        # The last input sample becomes index 0 of the next call
+        next_position = positions[-1] + step if len(positions) else self._position
+        self._position = next_position - (len(samples) - 1)
+        self._last = samples[-1]
+        return output
+
+
+class AudioSource:
+    """Something that writes mono float32 16 kHz audio into a ring buffer
+
+    start(sink) begins delivery into sink, which has the AudioRingBuffer
+    producer interface (write, free_space); stop() ends it.
+    """
+
+    sample_rate = SAMPLE_RATE
+
+    def start(self, sink):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class DeviceSource(AudioSource):
+    """Local input device through PortAudio; the default for ContinuousTranscriber"""
+
+    def __init__(self, device=None, block_duration=0.1):
+        self.device = device
+        self.block_duration = block_duration
+        self.stream = None
+
+    def start(self, sink):
+        import sounddevice as sd
+
+        tracer = get_tracer()
+
+        def audio_callback(indata, frames, time_info, status):
+            start = time.perf_counter_ns() if tracer.enabled else 0
+            if status:
+                logging.warning(f"Audio status: {status}")
+            try:
+                if indata.ndim > 1:
+                    audio_data = indata[:, 0] if indata.shape[1] == 1 else indata.mean(axis=1)
+                else:
+                    audio_data = indata
+                sink.write(audio_data)
+            except Exception as e:
+                logging.error(f"Error in audio callback: {str(e)}")
+            if start:
+                tracer.record_unscoped('capture', start)
+
+        self.stream = sd.InputStream(
+            callback=audio_callback,
+            device=self.device,
+            channels=1,
+            samplerate=self.sample_rate,
+            blocksize=int(self.sample_rate * self.block_duration)
+        )
+        self.stream.start()
+        logging.info("Audio stream started")
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+            logging.info("Audio stream stopped")
+
+
+class WavSource(AudioSource):
+    """Replay an audio file, paced at real time or as fast as the consumer keeps up
+
+    In fast mode the writer waits for free space in the sink instead of
+    overrunning it, so nothing is dropped.
+    """
+
+    def __init__(self, path, realtime=True, block_duration=0.1):
+        self.path = path
+        self.realtime = realtime
+        self.block_duration = block_duration
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, sink):
+        from batch_transcribe import load_audio
+
+        audio = load_audio(self.path)
+        self.finished.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(audio, sink), name='wav-source', daemon=True)
+        self._thread.start()
+        logging.info(f"Replaying {self.path} ({len(audio) / self.sample_rate:.1f}s, "
+                     f"{'real time' if self.realtime else 'as fast as possible'})")
+
+    def _run(self, audio, sink):
+        block = int(self.sample_rate * self.block_duration)
+        start_time = time.time()
+        for offset in range(0, len(audio), block):
+            if self._stop.is_set():
+                break
+            samples = audio[offset:offset + block]
+            if self.realtime:
+                delay = start_time + offset / self.sample_rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                while sink.free_space() < len(samples) and not self._stop.is_set():
+                    time.sleep(0.005)
+            sink.write(samples)
+        self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+class JitterBuffer:
+    """Absorb bursty network arrival and release audio at a steady real-time pace
+
+    Playout starts once target_delay seconds are buffered; release() then
+    hands out as many samples as the wall clock has advanced. On underrun it
+    stops and primes again to target_delay. is_full() tells the network
+    reader to stop reading (backpressure) past max_delay.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, target_delay=0.2, max_delay=2.0):
+        self.sample_rate = sample_rate
+        self.target_samples = int(sample_rate * target_delay)
+        self.max_samples = int(sample_rate * max_delay)
+        self._chunks = deque()
+        self.depth = 0
+        self.playing = False
+        self._last_time = None
+        self._credit = 0.0
+
+        self.underruns = 0
+
+    def push(self, samples):
+        if len(samples):
+            self._chunks.append(samples)
+            self.depth += len(samples)
+
+    def is_full(self):
+        return self.depth >= self.max_samples
+
+    def release(self, now, limit=None):
+        """Samples due for playout at time now, at most limit; None if nothing is due"""
+        if not self.playing:
+            if self.depth < self.target_samples:
+                return None
+            self.playing = True
+            self._last_time = now
+            self._credit = 0.0
+
+        self._credit += (now - self._last_time) * self.sample_rate
+        self._last_time = now
+        if self.depth == 0:
+            self.underruns += 1
+            self.playing = False
+            return None
+
+        count = int(min(self._credit, self.depth, self.depth if limit is None else limit))
+        if count <= 0:
+            return None
+        self._credit -= count
+        return self._take(count)
+
+    def drain(self, limit=None):
+        """Everything buffered (at most limit), e.g. once the sender has finished"""
+        count = self.depth if limit is None else min(self.depth, limit)
+        return self._take(count) if count > 0 else None
+
+    def _take(self, count):
+        parts = []
+        needed = count
+        while needed:
+            chunk = self._chunks[0]
+            if len(chunk) <= needed:
+                parts.append(self._chunks.popleft())
+                needed -= len(chunk)
+            else:
+                parts.append(chunk[:needed])
+                self._chunks[0] = chunk[needed:]
+                needed = 0
+        self.depth -= count
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+class IngestStream:
+    """One remote sender: decode, downmix, resample, jitter-buffer and play out into a sink"""
+
+    def __init__(self, stream_id, sink, sample_rate, channels=1, sample_format='s16le',
+                 jitter_delay=0.2, max_delay=2.0):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format '{sample_format}'")
+        self.stream_id = stream_id
+        self.sink = sink
+        self.channels = channels
+        self.dtype = np.dtype(SAMPLE_FORMATS[sample_format])
+        self.frame_bytes = self.dtype.itemsize * channels
+        self.resampler = StreamResampler(sample_rate, SAMPLE_RATE)
+        self.jitter = JitterBuffer(SAMPLE_RATE, jitter_delay, max_delay)
+        self._remainder = b''
+        self.closed = False
+
+        self.bytes_received = 0
+        self.samples_delivered = 0
+        self.backpressure_waits = 0
+
+    def decode(self, data):
+        """Turn received bytes into 16 kHz mono float32, keeping any partial frame for later"""
+        self.bytes_received += len(data)
+        data = self._remainder + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype)
+        if self.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return self.resampler.process(samples.astype(np.float32, copy=False))
+
+    async def feed(self, data, poll_interval=0.02):
+        self.jitter.push(self.decode(data))
+        # Not reading from the connection while full lets TCP flow control slow the sender
+        while self.jitter.is_full() and not self.closed:
+            self.backpressure_waits += 1
+            await asyncio.sleep(poll_interval)
+
+    def finish(self):
+        self.jitter.push(self.resampler.process(np.zeros(0, dtype=np.float32), last=True))
+        self.closed = True
+
+    def _deliver(self, samples):
+        if samples is not None:
+            self.sink.write(samples)
+            self.samples_delivered += len(samples)
+
+    async def play_out(self, tick=0.02):
+        loop = asyncio.get_running_loop()
+        while not self.closed:
+            await asyncio.sleep(tick)
+            self._deliver(self.jitter.release(loop.time(), limit=self.sink.free_space()))
+        # Sender is done: hand over the rest as the sink makes room
+        while self.jitter.depth:
+            self._deliver(self.jitter.drain(limit=self.sink.free_space()))
+            if self.jitter.depth:
+                await asyncio.sleep(tick)
+
+    def stats(self):
+        return {
+            'bytes_received': self.bytes_received,
+            'samples_delivered': self.samples_delivered,
+            'buffered_seconds': self.jitter.depth / SAMPLE_RATE,
+            'underruns': self.jitter.underruns,
+            'backpressure_waits': self.backpressure_waits,
+        }
+
+
+class PCMIngestServer:
+    """Accept raw PCM streams over TCP and WebSocket
+
+    A sender first sends a JSON header, as one line on TCP or one text
+    message on WebSocket:
+        {"stream": "seat-1", "sample_rate": 48000, "channels": 1, "format": "s16le"}
+    and then raw interleaved PCM (binary messages on WebSocket). The server
+    answers OK or ERROR <reason>. on_open(stream_id, header) returns the
+    sink for the stream (AudioRingBuffer interface) or None to refuse it;
+    on_close(stream_id) is called once the stream has been played out.
+    """
+
+    def __init__(self, on_open, on_close=None, host='0.0.0.0', port=7000, ws_port=None,
+                 jitter_delay=0.2, max_delay=2.0, max_streams=64):
+        self.on_open = on_open
+        self.on_close = on_close
+        self.host = host
+        self.port = port
+        self.ws_port = ws_port
+        self.jitter_delay = jitter_delay
+        self.max_delay = max_delay
+        self.max_streams = max_streams
+
+        self.streams = {}
+        self.streams_opened = 0
+        self.streams_refused = 0
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+
+    def _open(self, header, peer):
+        stream_id = str(header.get('stream') or peer)
+        if stream_id in self.streams:
+            raise ValueError(f"stream {stream_id} already connected")
+        if len(self.streams) >= self.max_streams:
+            raise ValueError("too many streams")
+        sink = self.on_open(stream_id, header)
+        if sink is None:
+            raise ValueError(f"stream {stream_id} refused")
+        stream = IngestStream(
+            stream_id, sink,
+            sample_rate=int(header.get('sample_rate', SAMPLE_RATE)),
+            channels=int(header.get('channels', 1)),
+            sample_format=header.get('format', 's16le'),
+            jitter_delay=self.jitter_delay,
+            max_delay=self.max_delay
+        )
+        self.streams[stream_id] = stream
+        self.streams_opened += 1
+        logging.info(f"Ingest stream {stream_id} opened from {peer}: {header}")
+        return stream
+
+    async def _close(self, stream, player):
+        stream.finish()
+        try:
+            await player
+        except asyncio.CancelledError:
+            # Player cancelled by server shutdown; the rest of the audio is discarded
+            pass
+        self.streams.pop(stream.stream_id, None)
+        logging.info(f"Ingest stream {stream.stream_id} closed: {stream.stats()}")
+        if self.on_close:
+            self.on_close(stream.stream_id)
+
+    async def _handle_tcp(self, reader, writer):
+        peer = '%s:%s' % writer.get_extra_info('peername')[:2]
+        try:
+            stream = self._open(json.loads(await reader.readline()), peer)
+        except Exception as e:
+            self.streams_refused += 1
+            writer.write(f"ERROR {str(e)}\n".encode('utf-8'))
+            await writer.drain()
+            writer.close()
+            return
+        writer.write(b"OK\n")
+        await writer.drain()
+
+        player = asyncio.ensure_future(stream.play_out())
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                await stream.feed(data)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logging.warning(f"Ingest stream {stream.stream_id} dropped: {str(e)}")
+        except asyncio.CancelledError:
+            # stop() with the sender still connected; end the stream instead of failing the task
+            logging.info(f"Ingest stream {stream.stream_id} closed by server shutdown")
+        finally:
+            writer.close()
+            await self._close(stream, player)
+
+    async def _handle_ws(self, request):
+        from aiohttp import web, WSMsgType
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        try:
+            message = await ws.receive()
+            stream = self._open(json.loads(message.data), request.remote)
+        except Exception as e:
+            self.streams_refused += 1
+            await ws.send_str(f"ERROR {str(e)}")
+            await ws.close()
+            return ws
+        await ws.send_str("OK")
+
+        player = asyncio.ensure_future(stream.play_out())
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    await stream.feed(message.data)
+                elif message.type == WSMsgType.ERROR:
+                    break
+        except asyncio.CancelledError:
+            logging.info(f"Ingest stream {stream.stream_id} closed by server shutdown")
+        finally:
+            await self._close(stream, player)
+        return ws
+
+    async def _serve(self, ready):
+        tcp_server = await asyncio.start_server(self._handle_tcp, self.host, self.port)
+        self.port = tcp_server.sockets[0].getsockname()[1]
+        ws_runner = None
+        if self.ws_port is not None:
+            from aiohttp import web
+
+            app = web.Application()
+            app.router.add_get('/ingest', self._handle_ws)
+            ws_runner = web.AppRunner(app, access_log=None)
+            await ws_runner.setup()
+            await web.TCPSite(ws_runner, self.host, self.ws_port).start()
+            self.ws_port = ws_runner.addresses[0][1]
+
+        self._stopping = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        ready.set()
+        logging.info(f"PCM ingest on tcp://{self.host}:{self.port}"
+                     + (f" and ws://{self.host}:{self.ws_port}/ingest" if ws_runner else ""))
+        try:
+            await self._stopping.wait()
+        finally:
+            self._loop = None
+            tcp_server.close()
+            await tcp_server.wait_closed()
+            if ws_runner is not None:
+                await ws_runner.cleanup()
+
+    def _run(self, ready):
+        try:
+            asyncio.run(self._serve(ready))
+        except Exception as e:
+            logging.error(f"PCM ingest server error: {str(e)}")
+            logging.error(traceback.format_exc())
+        finally:
+            ready.set()
+
+    def start(self, timeout=10.0):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='pcm-ingest', daemon=True)
+        self._thread.start()
+        ready.wait(timeout)
+        if self._loop is None:
+            raise RuntimeError(f"PCM ingest server failed to start on {self.host}:{self.port}")
+        return self
+
+    def stop(self, timeout=5.0):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            'streams': {stream_id: stream.stats() for stream_id, stream in list(self.streams.items())},
+            'opened': self.streams_opened,
+            'refused': self.streams_refused,
+        }
+
+
+class NetworkSource(AudioSource):
+    """Feed a ContinuousTranscriber from one remote sender through a PCMIngestServer"""
+
+    def __init__(self, host='0.0.0.0', port=7000, ws_port=None, jitter_delay=0.2, max_delay=2.0):
+        self.options = dict(host=host, port=port, ws_port=ws_port,
+                            jitter_delay=jitter_delay, max_delay=max_delay, max_streams=1)
+        self.server = None
+
+    def start(self, sink):
+        self.server = PCMIngestServer(lambda stream_id, header: sink, **self.options).start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+
+
+def send_pcm(audio, host='127.0.0.1', port=7000, stream_id=None, sample_rate=SAMPLE_RATE,
+             realtime=True, block_duration=0.1):
+    """Loopback/test sender: stream float32 mono audio over TCP as s16le; returns seconds taken"""
+    import socket
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+    header = {'stream': stream_id, 'sample_rate': sample_rate, 'channels': 1, 'format': 's16le'}
+    block = int(sample_rate * block_duration)
+    start_time = time.time()
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(header) + '\n').encode('utf-8'))
+        reply = sock.makefile('rb').readline().decode('utf-8').strip()
+        if reply != 'OK':
+            raise ConnectionError(f"Ingest server refused stream: {reply}")
+        for offset in range(0, len(pcm), block):
+            if realtime:
+                delay = start_time + offset / sample_rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            # Blocks when the server applies backpressure
+            sock.sendall(pcm[offset:offset + block].tobytes())
+    return time.time() - start_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Network audio ingest for headless transcription')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help='Transcribe every connected stream')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=7000)
+    serve.add_argument('--ws-port', type=int, default=None)
+    serve.add_argument('-l', '--language', default='es')
+    serve.add_argument('-s', '--source-language', default='en',
+                       help="Spoken language, or 'auto' to detect it per utterance and stream")
+    serve.add_argument('--jitter', type=float, default=0.2, help='Jitter buffer delay in seconds')
+
+    send = subparsers.add_parser('send', help='Stream an audio file to an ingest server')
+    send.add_argument('file')
+    send.add_argument('--host', default='127.0.0.1')
+    send.add_argument('--port', type=int, default=7000)
+    send.add_argument('--stream', default=None)
+    send.add_argument('--fast', action='store_true', help='Send as fast as the server accepts')
+    args = parser.parse_args(argv)
+
+    if args.command == 'send':
+        import soundfile as sf
+
+        audio, sample_rate = sf.read(args.file, dtype='float32', always_2d=False)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        elapsed = send_pcm(audio, args.host, args.port, args.stream or args.file,
+                           sample_rate, realtime=not args.fast)
+        print(f"Sent {len(audio) / sample_rate:.1f}s of audio in {elapsed:.1f}s")
+        return 0
+
+    from model import ContinuousTranscriber
+    from multistream import MultiStreamEngine
+
+    transcriber = ContinuousTranscriber(target_language=args.language, source_language=args.source_language)
+    engine = MultiStreamEngine(transcriber)
+
+    def on_open(stream_id, header):
+        engine.add_stream(
+            stream_id,
+            lambda transcription, translation: logging.info(
+                f"[{stream_id}] {transcription} -> {translation}")
+        )
+        return engine.streams[stream_id].buffer
+
+    server = PCMIngestServer(on_open, engine.remove_stream, args.host, args.port,
+                             args.ws_port, jitter_delay=args.jitter).start()
+    engine.start()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        engine.stop()
+        transcriber.close()
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from vad import UtteranceSegmenter
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+SAMPLE_RATE = 16000
+
+# Set in each worker process by _init_worker
+_transcriber = None
+
+
+def load_audio(path, raw_sample_rate=SAMPLE_RATE, raw_channels=1):
+    """Load a WAV/FLAC file or raw 16-bit PCM as mono float32 at 16 kHz"""
+    if path.lower().endswith(('.raw', '.pcm')):
+        data = np.fromfile(path, dtype=np.int16).astype(np.float32) / 32768.0
+        if raw_channels > 1:
+            data = data[:len(data) // raw_channels * raw_channels].reshape(-1, raw_channels)
+        sample_rate = raw_sample_rate
+    else:
+        import soundfile as sf
+        data, sample_rate = sf.read(path, dtype='float32', always_2d=False)
+
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    return resample(data.astype(np.float32), sample_rate, SAMPLE_RATE)
+
+
+def resample(audio, source_rate, target_rate):
+    if source_rate == target_rate or len(audio) == 0:
+        return audio
+    try:
+        import soxr
+        return soxr.resample(audio, source_rate, target_rate).astype(np.float32)
+    except ImportError:
+        # Linear interpolation is good enough for speech recognition input
+        duration = len(audio) / source_rate
+        target_length = int(round(duration * target_rate))
+        positions = np.linspace(0, len(audio) - 1, target_length)
+        return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def segment_audio(audio, max_utterance_duration):
+    """Split a whole recording into (start, end, audio) utterances with the VAD"""
+    segmenter = UtteranceSegmenter(
+        sample_rate=SAMPLE_RATE,
+        max_utterance_duration=max_utterance_duration
+    )
+    # Start from the file's own noise floor instead of the fixed initial one, and push
+    # in the live loop's 100 ms blocks so the floor keeps adapting through the file
+    segmenter.vad.calibrate(audio)
+    block = int(SAMPLE_RATE * 0.1)
+    segments = []
+    for start in range(0, len(audio), block):
+        segments.extend(segmenter.push(audio[start:start + block], return_times=True))
+    last = segmenter.flush(return_times=True)
+    if last is not None:
+        segments.append(last)
+    return segments
+
+
+def format_timestamp(seconds, separator):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def _caption_lines(record):
+    lines = [record['text']]
+    lines.extend(t for t in record['translations'].values() if t)
+    return '\n'.join(lines)
+
+
+def write_srt(records, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, record in enumerate(records, 1):
+            f.write(f"{index}\n")
+            f.write(f"{format_timestamp(record['start'], ',')} --> "
+                    f"{format_timestamp(record['end'], ',')}\n")
+            f.write(f"{_caption_lines(record)}\n\n")
+
+
+def write_vtt(records, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for record in records:
+            f.write(f"{format_timestamp(record['start'], '.')} --> "
+                    f"{format_timestamp(record['end'], '.')}\n")
+            f.write(f"{_caption_lines(record)}\n\n")
+
+
+def write_jsonl(records, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+WRITERS = {'srt': write_srt, 'vtt': write_vtt, 'jsonl': write_jsonl}
+
+
+def _init_worker(target_languages, torch_threads, source_language='en'):
+    global _transcriber
+    import torch
+    from model import ContinuousTranscriber
+
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    _transcriber = ContinuousTranscriber(target_languages=target_languages, source_language=source_language)
+
+
+def transcribe_file(path, output_dir, formats, batch_size=8, max_utterance_duration=10.0):
+    """Transcribe and translate one file in the current worker; returns a summary dict"""
+    start_time = time.time()
+    audio = load_audio(path)
+    audio_duration = len(audio) / SAMPLE_RATE
+    segments = segment_audio(audio, max_utterance_duration)
+
+    records = []
+    # A file is one speaker stream; its language prior skips detection once stable
+    prior = _transcriber.new_language_prior()
+    for offset in range(0, len(segments), batch_size):
+        batch = segments[offset:offset + batch_size]
+        texts, sources = _transcriber._decode_batch(
+            [segment for _, _, segment in batch], priors=[prior] * len(batch)
+        )
+
+        requests = [(text, language, source) for text, source in zip(texts, sources)
+                    for language in _transcriber.target_languages]
+        translations = _transcriber._translate_many(requests)
+
+        per_segment = len(_transcriber.target_languages)
+        for i, ((start, end, _), text, source) in enumerate(zip(batch, texts, sources)):
+            if not text:
+                continue
+            row = translations[i * per_segment:(i + 1) * per_segment]
+            records.append({
+                'start': round(start, 3),
+                'end': round(end, 3),
+                'language': source,
+                'text': text,
+                'translations': dict(zip(_transcriber.target_languages, row)),
+            })
+
+    base = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    for fmt in formats:
+        WRITERS[fmt](records, f"{base}.{fmt}")
+
+    elapsed = time.time() - start_time
+    return {
+        'file': path,
+        'audio_duration': audio_duration,
+        'processing_time': elapsed,
+        'real_time_factor': elapsed / audio_duration if audio_duration else 0.0,
+        'segments': len(records),
+    }
+
+
+def run_batch(paths, output_dir, target_languages, formats, workers=None,
+              batch_size=8, max_utterance_duration=10.0, source_language='en'):
+    """Process files across a pool of worker processes, each with its own models"""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or max(1, (os.cpu_count() or 1) // 4)
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    logging.info(f"Transcribing {len(paths)} files with {workers} workers, "
+                 f"{torch_threads} threads each")
+
+    start_time = time.time()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(target_languages, torch_threads, source_language)
+    ) as executor:
+        futures = {
+            executor.submit(transcribe_file, path, output_dir, formats,
+                            batch_size, max_utterance_duration): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+                results.append(result)
+                logging.info(f"{result['file']}: {result['segments']} segments, "
+                             f"RTF {result['real_time_factor']:.3f}")
+            except Exception as e:
+                logging.error(f"Error transcribing {futures[future]}: {str(e)}")
+                logging.error(traceback.format_exc())
+
+    elapsed = time.time() - start_time
+    total_audio = sum(r['audio_duration'] for r in results)
+    summary = {
+        'files': len(results),
+        'audio_duration': total_audio,
+        'wall_time': elapsed,
+        'real_time_factor': elapsed / total_audio if total_audio else 0.0,
+    }
+    logging.info(f"Processed {total_audio:.1f}s of audio in {elapsed:.1f}s "
+                 f"(overall RTF {summary['real_time_factor']:.3f})")
+    return results, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline transcription and translation of audio files')
+    parser.add_argument('files', nargs='+', help='WAV, FLAC or raw 16-bit PCM (.raw/.pcm) files')
+    parser.add_argument('-o', '--output-dir', default='captions')
+    parser.add_argument('-l', '--languages', default='es',
+                        help='Comma-separated target languages, e.g. es,fr,pt')
+    parser.add_argument('-f', '--formats', default='srt,jsonl',
+                        help='Comma-separated output formats: srt, vtt, jsonl')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-b', '--batch-size', type=int, default=8)
+    parser.add_argument('--max-utterance', type=float, default=10.0,
+                        help='Longest segment in seconds before it is cut')
+    parser.add_argument('-s', '--source-language', default='en',
+                        help="Spoken language, or 'auto' to detect it per segment")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown:
+        parser.error(f"Unknown output formats: {', '.join(unknown)}")
+
+    languages = [l.strip() for l in args.languages.split(',') if l.strip()]
+    _, summary = run_batch(args.files, args.output_dir, languages, formats,
+                           args.workers, args.batch_size, args.max_utterance,
+                           args.source_language)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
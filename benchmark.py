@@ -0,0 +1,430 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import resource
+import threading
+import numpy as np
+import torch
+
+from model_manager import ModelManager
+from metrics import percentiles
+from tracing import get_tracer
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+SAMPLE_RATE = 16000
+
+# Metrics where a larger value is a regression
+LOWER_IS_BETTER = ('p50', 'p95', 'p99', 'real_time_factor', 'peak_rss_mb', 'load_time')
+
+
+# Stub models: same interfaces as the Hugging Face objects, fixed cost per call
+
+class _Features:
+    def __init__(self, batch_size):
+        self.input_features = torch.zeros((batch_size, 80, 3000))
+
+
+class _TokenBatch(dict):
+    def to(self, device):
+        return self
+
+
+class StubProcessor:
+    def __call__(self, audio, sampling_rate=None, return_tensors=None):
+        return _Features(len(audio) if isinstance(audio, list) else 1)
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return ["this is a benchmark sentence"] * len(ids)
+
+
+class StubWhisper:
+    def __init__(self, seconds_per_call=0.05, seconds_per_item=0.01):
+        self.seconds_per_call = seconds_per_call
+        self.seconds_per_item = seconds_per_item
+
+    def generate(self, input_features, **kwargs):
+        batch_size = input_features.shape[0]
+        time.sleep(self.seconds_per_call + self.seconds_per_item * batch_size)
+        return torch.zeros((batch_size, 8), dtype=torch.long)
+
+
+class StubTokenizer:
+    def __call__(self, texts, return_tensors=None, padding=True):
+        batch_size = len(texts) if isinstance(texts, list) else 1
+        return _TokenBatch(input_ids=torch.zeros((batch_size, 8), dtype=torch.long))
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return ["esta es una frase de prueba"] * len(ids)
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "esta es una frase de prueba"
+
+
+class StubMarian:
+    def __init__(self, seconds_per_call=0.03, seconds_per_item=0.01):
+        self.seconds_per_call = seconds_per_call
+        self.seconds_per_item = seconds_per_item
+
+    def generate(self, input_ids=None, **kwargs):
+        batch_size = input_ids.shape[0]
+        time.sleep(self.seconds_per_call + self.seconds_per_item * batch_size)
+        return torch.zeros((batch_size, 8), dtype=torch.long)
+
+
+class StubModelManager(ModelManager):
+    """Hands out stub models under the same keys the transcriber asks for"""
+
+    loaders = {
+        'whisper': lambda: (StubWhisper(), StubProcessor()),
+        'marian': lambda: (StubMarian(), StubTokenizer()),
+    }
+
+    def acquire(self, key, loader):
+        return super().acquire(key, self.loaders.get(key[0], loader))
+
+
+def synthetic_speech(duration, seed=0):
+    """Voiced, syllable-modulated tones separated by pauses, which the VAD treats as speech"""
+    rng = np.random.default_rng(seed)
+    audio = (rng.standard_normal(int(duration * SAMPLE_RATE)) * 0.001).astype(np.float32)
+    position = 0.5
+    while position < duration - 0.5:
+        length = min(rng.uniform(1.0, 3.0), duration - position - 0.2)
+        t = np.arange(int(length * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = rng.uniform(100, 200)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * 4 * t)) * 0.2
+        start = int(position * SAMPLE_RATE)
+        audio[start:start + len(t)] += (voiced * envelope).astype(np.float32)
+        position += length + rng.uniform(0.4, 1.0)
+    return audio
+
+
+def load_fixture(path):
+    from batch_transcribe import load_audio
+    return load_audio(path)
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def build_transcriber(stub, target_language, **kwargs):
+    from model import ContinuousTranscriber
+
+    manager = StubModelManager() if stub else ModelManager()
+    start_time = time.time()
+    transcriber = ContinuousTranscriber(
+        target_language=target_language,
+        model_manager=manager,
+        translation_cache_path=None,
+        **kwargs
+    )
+    load_time = time.time() - start_time
+    return transcriber, load_time, manager.stats()
+
+
+def bench_stages(transcriber, audio, chunk_duration=2.0):
+    """Time ASR, MT and process_audio_chunk over fixed chunks of the fixture"""
+    chunk_samples = int(chunk_duration * SAMPLE_RATE)
+    asr, mt, chunk = [], [], []
+    busy = 0.0
+    for offset in range(0, len(audio) - chunk_samples + 1, chunk_samples):
+        segment = audio[offset:offset + chunk_samples]
+        if not transcriber._is_speech(segment):
+            continue
+
+        start_time = time.perf_counter()
+        text = transcriber._transcribe_audio(segment)
+        asr_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        transcriber._translate_text(text)
+        mt_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        transcriber.process_audio_chunk(segment)
+        chunk_time = time.perf_counter() - start_time
+
+        asr.append(asr_time)
+        mt.append(mt_time)
+        chunk.append(chunk_time)
+        busy += chunk_time
+
+    duration = len(audio) / SAMPLE_RATE
+    return {
+        'asr': percentiles(asr),
+        'mt': percentiles(mt),
+        'process_audio_chunk': percentiles(chunk),
+        'real_time_factor': busy / duration if duration else 0.0,
+    }
+
+
+def bench_loop(transcriber, audio, speed=1.0, block_duration=0.1):
+    """Feed the fixture through the ring buffer and run the real process_audio loop
+
+    Caption latency is measured from the moment the audio consumed for a
+    caption had been written to the buffer until the callback fires.
+    """
+    block = int(block_duration * SAMPLE_RATE)
+    write_log = []
+    latencies = []
+
+    def feed():
+        for offset in range(0, len(audio), block):
+            transcriber.buffer.write(audio[offset:offset + block])
+            write_log.append((transcriber.buffer.total_written, time.time()))
+            time.sleep(block_duration / speed)
+
+    def on_caption(transcription, translation):
+        now = time.time()
+        consumed = transcriber.buffer.total_read
+        written_at = next((t for pos, t in write_log if pos >= consumed), now)
+        latencies.append(now - written_at)
+
+    transcriber.set_callback(on_caption)
+    transcriber.running = True
+    worker = threading.Thread(target=transcriber.process_audio)
+    start_time = time.time()
+    worker.start()
+    feed()
+    # Let the last utterance drain before stopping
+    time.sleep(1.0)
+    transcriber.running = False
+    worker.join(timeout=10.0)
+    elapsed = time.time() - start_time
+
+    result = percentiles(latencies)
+    result['wall_time'] = elapsed
+    result['skipped_silent'] = transcriber.chunks_skipped_silent
+    result['dropped_samples'] = transcriber.buffer.dropped_samples
+    return result
+
+
+def run_benchmark(stub=True, fixture=None, duration=30.0, target_language='es', speed=1.0,
+                  trace=None, trace_sample_rate=1.0):
+    """Benchmark stages and the end-to-end loop; trace writes a Chrome trace of the loop"""
+    audio = load_fixture(fixture) if fixture else synthetic_speech(duration)
+    transcriber, load_time, model_stats = build_transcriber(stub, target_language)
+    tracer = get_tracer()
+    results = {
+        'stub_models': stub,
+        'audio_duration': len(audio) / SAMPLE_RATE,
+        'load_time': load_time,
+        'models': {str(k): v['load_time'] for k, v in model_stats.items()},
+        'stages': bench_stages(transcriber, audio),
+    }
+    if trace:
+        # Only the end-to-end loop is traced, so the stage timings stay untouched
+        tracer.clear()
+        tracer.enable(trace_sample_rate)
+    results['end_to_end'] = bench_loop(transcriber, audio, speed=speed)
+    if trace:
+        tracer.disable()
+        results['trace'] = {
+            'file': trace,
+            'spans': transcriber.export_trace(trace),
+            'slowest_segments': tracer.slowest(5),
+        }
+    results['peak_rss_mb'] = peak_rss_mb()
+    transcriber.close()
+    return results
+
+
+def compare_backends(audio, backends=('torch', 'cpu-int8'), target_language='es'):
+    """Run the same VAD segments through each backend with real models
+
+    Reports per-backend ASR and MT p50, the speedup relative to the first
+    backend, and the word error rate of each backend's transcript against the
+    first backend's (float32) transcript.
+    """
+    from batch_transcribe import segment_audio
+
+    segments = [segment for _, _, segment in segment_audio(audio, 10.0)]
+    results = {}
+    reference = None
+    for name in backends:
+        transcriber, load_time, _ = build_transcriber(False, target_language, backend=name)
+        asr, mt, texts = [], [], []
+        for segment in segments:
+            start_time = time.perf_counter()
+            text = transcriber._transcribe_audio(segment)
+            asr.append(time.perf_counter() - start_time)
+            start_time = time.perf_counter()
+            transcriber._translate_text(text)
+            mt.append(time.perf_counter() - start_time)
+            texts.append(text)
+        transcriber.close()
+
+        transcript = ' '.join(texts)
+        if reference is None:
+            reference = transcript
+        results[name] = {
+            'load_time': load_time,
+            'asr': percentiles(asr),
+            'mt': percentiles(mt),
+            'total_time': sum(asr) + sum(mt),
+            'wer_vs_reference': word_error_rate(reference, transcript),
+        }
+
+    base_time = results[backends[0]]['total_time']
+    for name in backends:
+        total = results[name]['total_time']
+        results[name]['speedup'] = base_time / total if total else 0.0
+    return results
+
+
+def compare_context(audio, granularities=(1.0, 0.5), target_language='es', backend=None):
+    """Compare the padded 30 s encoder against short-context mode with real models
+
+    Each VAD segment is transcribed with the padded path and with short
+    context at every granularity (in seconds). Reports ASR p50, the speedup
+    over the padded path and the word error rate against the padded transcript.
+    """
+    from batch_transcribe import segment_audio
+
+    segments = [segment for _, _, segment in segment_audio(audio, 10.0)]
+    configs = [('padded', {})] + [
+        (f"short_{g:g}s", {'short_context': True, 'context_granularity': g}) for g in granularities
+    ]
+    results = {}
+    reference = None
+    for name, options in configs:
+        transcriber, load_time, _ = build_transcriber(False, target_language, backend=backend, **options)
+        # First call pays one-off allocation costs
+        transcriber._transcribe_audio(segments[0])
+        asr, texts = [], []
+        for segment in segments:
+            start_time = time.perf_counter()
+            texts.append(transcriber._transcribe_audio(segment))
+            asr.append(time.perf_counter() - start_time)
+        transcriber.close()
+
+        transcript = ' '.join(texts)
+        if reference is None:
+            reference = transcript
+        results[name] = {
+            'asr': percentiles(asr),
+            'total_time': sum(asr),
+            'wer_vs_padded': word_error_rate(reference, transcript),
+        }
+
+    base_time = results['padded']['total_time']
+    for name in results:
+        total = results[name]['total_time']
+        results[name]['speedup'] = base_time / total if total else 0.0
+    return results
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results, baseline, tolerance=0.10):
+    """Return a list of (metric, baseline, current) that regressed by more than tolerance"""
+    current = _flatten(results)
+    previous = _flatten(baseline)
+    regressions = []
+    for name, old in previous.items():
+        if name not in current or not name.endswith(LOWER_IS_BETTER) or old <= 0:
+            continue
+        if current[name] > old * (1 + tolerance):
+            regressions.append((name, old, current[name]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Latency and throughput benchmark for the transcriber')
+    parser.add_argument('--real-models', action='store_true',
+                        help='Load the real Whisper/Marian models instead of stubs')
+    parser.add_argument('--fixture', help='Audio file to use instead of synthetic speech')
+    parser.add_argument('--duration', type=float, default=30.0,
+                        help='Length of the synthetic fixture in seconds')
+    parser.add_argument('--language', default='es')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Feed rate for the loop benchmark, 1.0 is real time')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='Write results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--compare-backends', metavar='NAMES',
+                        help='Comma-separated backends to compare with real models, e.g. torch,cpu-int8')
+    parser.add_argument('--compare-context', metavar='SECONDS',
+                        help='Comma-separated short-context granularities to compare against '
+                             'the padded encoder with real models, e.g. 1.0,0.5')
+    parser.add_argument('--backend', help='Inference backend for --compare-context')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='Write a Chrome trace of the end-to-end loop to this JSON file')
+    parser.add_argument('--trace-sample-rate', type=float, default=1.0,
+                        help='Fraction of segments to trace')
+    args = parser.parse_args(argv)
+
+    if args.compare_backends:
+        audio = load_fixture(args.fixture) if args.fixture else synthetic_speech(args.duration)
+        backends = tuple(b.strip() for b in args.compare_backends.split(',') if b.strip())
+        print(json.dumps(compare_backends(audio, backends, args.language), indent=2))
+        return 0
+
+    if args.compare_context:
+        audio = load_fixture(args.fixture) if args.fixture else synthetic_speech(args.duration)
+        granularities = tuple(float(g) for g in args.compare_context.split(',') if g.strip())
+        print(json.dumps(compare_context(audio, granularities, args.language, args.backend), indent=2))
+        return 0
+
+    results = run_benchmark(
+        stub=not args.real_models,
+        fixture=args.fixture,
+        duration=args.duration,
+        target_language=args.language,
+        speed=args.speed,
+        trace=args.trace,
+        trace_sample_rate=args.trace_sample_rate
+    )
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.4f} -> {new:.4f}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
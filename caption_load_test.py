@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import multiprocessing
+
+from caption_server import CaptionServer
+from metrics import percentiles
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+
+async def _run_clients(url, num_clients, connected, stop, event):
+    import socketio
+
+    latencies = []
+
+    async def connect():
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on(event)
+        async def on_caption(data):
+            latencies.append(time.time() - data['timestamp'])
+
+        await client.connect(url, transports=['websocket'], wait_timeout=30)
+        with connected.get_lock():
+            connected.value += 1
+        return client
+
+    results = await asyncio.gather(*(connect() for _ in range(num_clients)), return_exceptions=True)
+    clients = [c for c in results if not isinstance(c, Exception)]
+
+    while not stop.is_set():
+        await asyncio.sleep(0.1)
+    # Let captions still in flight arrive
+    await asyncio.sleep(0.5)
+    await asyncio.gather(*(c.disconnect() for c in clients), return_exceptions=True)
+    return {'connected': len(clients), 'failed': num_clients - len(clients), 'latencies': latencies}
+
+
+def _client_process(url, num_clients, connected, stop, results, event):
+    """Caption clients in their own process so they do not share the server's GIL"""
+    logging.getLogger('socketio').setLevel(logging.ERROR)
+    logging.getLogger('engineio').setLevel(logging.ERROR)
+    results.put(asyncio.run(_run_clients(url, num_clients, connected, stop, event)))
+
+
+def run_level(num_clients, processes=4, rate=5.0, duration=10.0, queue_size=8,
+              connect_timeout=60.0):
+    """Serve num_clients clients for duration seconds at rate captions per second"""
+    server = CaptionServer(host='127.0.0.1', port=0, queue_size=queue_size).start()
+    url = f"http://127.0.0.1:{server.port}"
+    context = multiprocessing.get_context('spawn')
+    connected = context.Value('i', 0)
+    stop = context.Event()
+    results = context.Queue()
+
+    processes = max(1, min(processes, num_clients))
+    shares = [num_clients // processes + (1 if i < num_clients % processes else 0) for i in range(processes)]
+    workers = [
+        context.Process(target=_client_process, args=(url, share, connected, stop, results, server.event))
+        for share in shares
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Publish only once every client has had its chance to connect
+    deadline = time.time() + connect_timeout
+    while server.stats()['clients'] < num_clients and time.time() < deadline:
+        if not any(worker.is_alive() for worker in workers):
+            break
+        time.sleep(0.1)
+
+    interval = 1.0 / rate
+    start_time = time.time()
+    published = 0
+    while time.time() - start_time < duration:
+        published += 1
+        server.publish(f"caption {published} " + 'word ' * 12, f"subtitulo {published} " + 'palabra ' * 12)
+        time.sleep(max(0.0, start_time + published * interval - time.time()))
+
+    stop.set()
+    latencies = []
+    clients = 0
+    failed = 0
+    for _ in workers:
+        result = results.get(timeout=60)
+        latencies.extend(result['latencies'])
+        clients += result['connected']
+        failed += result['failed']
+    for worker in workers:
+        worker.join(timeout=10)
+
+    server_stats = server.stats()
+    server.stop()
+    expected = published * clients
+    return {
+        'clients': num_clients,
+        'connected': clients,
+        'failed': failed,
+        'published': published,
+        'received': len(latencies),
+        'delivery_ratio': len(latencies) / expected if expected else 0.0,
+        'latency': percentiles(latencies),
+        'coalesced': server_stats['coalesced'],
+        'timeouts': server_stats['timeouts'],
+    }
+
+
+def run_load_test(levels, processes=4, rate=5.0, duration=10.0, latency_target=0.25,
+                  min_delivery=0.95):
+    """Step through client counts; the capacity is the largest level meeting both targets"""
+    results = []
+    capacity = 0
+    for num_clients in levels:
+        result = run_level(num_clients, processes, rate, duration)
+        result['ok'] = (result['failed'] == 0
+                        and result['latency']['p95'] <= latency_target
+                        and result['delivery_ratio'] >= min_delivery)
+        results.append(result)
+        logging.warning(
+            f"{num_clients} clients: p95 {result['latency']['p95'] * 1000:.1f} ms, "
+            f"delivery {result['delivery_ratio']:.3f}, coalesced {result['coalesced']}"
+        )
+        if not result['ok']:
+            break
+        capacity = num_clients
+    return {
+        'rate': rate,
+        'duration': duration,
+        'latency_target': latency_target,
+        'capacity_clients': capacity,
+        'levels': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the caption broadcast server')
+    parser.add_argument('--levels', default='10,50,100,250,500,1000',
+                        help='Comma-separated concurrent client counts to step through')
+    parser.add_argument('--processes', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Client processes the clients are spread over')
+    parser.add_argument('--rate', type=float, default=5.0, help='Captions published per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to publish per level')
+    parser.add_argument('--latency-target', type=float, default=0.25,
+                        help='p95 publish-to-receive latency in seconds a level must meet')
+    parser.add_argument('--min-delivery', type=float, default=0.95,
+                        help='Fraction of captions each client must receive, the rest coalesced')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    levels = [int(l) for l in args.levels.split(',') if l.strip()]
+    results = run_load_test(levels, args.processes, args.rate, args.duration,
+                            args.latency_target, args.min_delivery)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
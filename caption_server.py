@@ -0,0 +1,264 @@
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import threading
+import traceback
+from collections import deque
+
+import socketio
+from aiohttp import web
+
+from metrics import Histogram
+
+
+class ClientQueue:
+    """Bounded send queue for one caption client
+
+    Captions are whole "latest text" updates, so a client that falls behind
+    only needs the newest one: when the queue is full its backlog is
+    replaced by the incoming caption. Only touched from the event loop.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.event = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def put(self, caption):
+        if len(self.items) >= self.maxsize:
+            self.coalesced += len(self.items)
+            self.items.clear()
+        self.items.append(caption)
+        self.event.set()
+
+    def replay(self, captions):
+        self.items.extend(captions)
+        if self.items:
+            self.event.set()
+
+    async def get(self):
+        while not self.items:
+            self.event.clear()
+            await self.event.wait()
+        return self.items.popleft()
+
+
+class CaptionServer:
+    """Broadcast transcriber results to socket.io caption clients
+
+    Serves the transcription_update events that caption_window.py listens
+    for. publish() is thread-safe and can be passed directly to
+    ContinuousTranscriber.set_callback. Each client has its own sender task
+    with one caption in flight at a time (the client's ack ends it), so a
+    slow client only grows its own bounded queue, which coalesces to the
+    latest caption, and never delays the others. Late joiners get the last
+    history_size captions replayed.
+    """
+
+    def __init__(self, host='127.0.0.1', port=5000, queue_size=8, history_size=5,
+                 send_timeout=5.0, event='transcription_update'):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.event = event
+        self.history = deque(maxlen=history_size)
+
+        self.sio = None
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+        self._clients = {}
+        self._senders = {}
+        self._sequence = 0
+        self._sequence_lock = threading.Lock()
+
+        self.published = 0
+        self.connections = 0
+        self.closed_stats = {'sent': 0, 'coalesced': 0, 'timeouts': 0}
+        self.delivery_latency = Histogram(
+            'caption_delivery_seconds', 'Time from publish to client acknowledgement')
+
+    def publish(self, transcription, translation=None, translations=None):
+        """Queue a caption for every connected client; safe to call from any thread"""
+        with self._sequence_lock:
+            self._sequence += 1
+            sequence = self._sequence
+        caption = {
+            'seq': sequence,
+            'timestamp': time.time(),
+            'transcription': transcription,
+            'translation': translation,
+        }
+        if translations:
+            caption['translations'] = translations
+
+        loop = self._loop
+        if loop is None:
+            logging.debug("Caption server not running, caption dropped")
+            return
+        loop.call_soon_threadsafe(self._broadcast, caption)
+
+    def _broadcast(self, caption):
+        self.history.append(caption)
+        self.published += 1
+        for queue in self._clients.values():
+            queue.put(caption)
+
+    async def _send_loop(self, sid, queue):
+        while True:
+            caption = await queue.get()
+            try:
+                # call() waits for the client's ack, so each client has one caption in flight
+                await self.sio.call(self.event, caption, to=sid, timeout=self.send_timeout)
+                queue.sent += 1
+                self.delivery_latency.observe(time.time() - caption['timestamp'])
+            except socketio.exceptions.TimeoutError:
+                queue.timeouts += 1
+                logging.warning(f"Caption client {sid} did not acknowledge within {self.send_timeout}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.debug(f"Send to caption client {sid} failed: {str(e)}")
+                return
+
+    def _register_handlers(self):
+        @self.sio.event
+        async def connect(sid, environ, auth=None):
+            queue = ClientQueue(self.queue_size)
+            queue.replay(self.history)
+            self._clients[sid] = queue
+            self._senders[sid] = asyncio.ensure_future(self._send_loop(sid, queue))
+            self.connections += 1
+            logging.info(f"Caption client connected: {sid} ({len(self._clients)} connected)")
+
+        @self.sio.event
+        async def disconnect(sid):
+            self._drop_client(sid)
+            logging.info(f"Caption client disconnected: {sid} ({len(self._clients)} connected)")
+
+    def _drop_client(self, sid):
+        sender = self._senders.pop(sid, None)
+        if sender is not None:
+            sender.cancel()
+        queue = self._clients.pop(sid, None)
+        if queue is not None:
+            self.closed_stats['sent'] += queue.sent
+            self.closed_stats['coalesced'] += queue.coalesced
+            self.closed_stats['timeouts'] += queue.timeouts
+
+    async def _serve(self, ready):
+        self.sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+        self._register_handlers()
+        app = web.Application()
+        self.sio.attach(app)
+
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+        # Resolves port 0 to the port actually bound
+        self.port = runner.addresses[0][1]
+
+        self._stopping = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        ready.set()
+        logging.info(f"Caption server listening on http://{self.host}:{self.port}")
+
+        try:
+            await self._stopping.wait()
+        finally:
+            self._loop = None
+            for sid in list(self._clients):
+                self._drop_client(sid)
+            await runner.cleanup()
+
+    def _run(self, ready):
+        try:
+            asyncio.run(self._serve(ready))
+        except Exception as e:
+            logging.error(f"Caption server error: {str(e)}")
+            logging.error(traceback.format_exc())
+        finally:
+            ready.set()
+
+    def start(self, timeout=10.0):
+        """Run the event loop on a background thread; returns once the port is bound"""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='caption-server', daemon=True)
+        self._thread.start()
+        ready.wait(timeout)
+        if self._loop is None:
+            raise RuntimeError(f"Caption server failed to start on {self.host}:{self.port}")
+        return self
+
+    def stop(self, timeout=5.0):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logging.warning("Caption server did not stop cleanly")
+            self._thread = None
+
+    def stats(self):
+        queues = list(self._clients.values())
+        return {
+            'clients': len(queues),
+            'connections': self.connections,
+            'published': self.published,
+            'sent': self.closed_stats['sent'] + sum(q.sent for q in queues),
+            'coalesced': self.closed_stats['coalesced'] + sum(q.coalesced for q in queues),
+            'timeouts': self.closed_stats['timeouts'] + sum(q.timeouts for q in queues),
+            'max_queue_depth': max((len(q.items) for q in queues), default=0),
+            'delivery_latency': self.delivery_latency.snapshot(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Transcribe the microphone and broadcast captions')
+    parser.add_argument('-l', '--language', default='es')
+    parser.add_argument('-s', '--source-language', default='en',
+                        help="Spoken language, or 'auto' to detect it per utterance")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='Per-client send queue length before coalescing to the latest caption')
+    parser.add_argument('--history', type=int, default=5,
+                        help='Captions replayed to clients that join late')
+    args = parser.parse_args(argv)
+
+    from model import ContinuousTranscriber
+
+    server = CaptionServer(args.host, args.port, args.queue_size, args.history).start()
+    transcriber = ContinuousTranscriber(target_language=args.language, source_language=args.source_language)
+    transcriber.set_multi_callback(
+        lambda transcription, translations: server.publish(
+            transcription, translations.get(transcriber.target_language), translations
+        )
+    )
+    transcriber.start_transcription()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transcriber.close()
+        logging.info(f"Caption server stats: {server.stats()}")
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
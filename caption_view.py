@@ -0,0 +1,117 @@
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+
+
+class UpdateThrottle(QObject):
+    """Coalesce bursts of updates into at most max_fps calls of apply
+
+    submit() only stores the newest arguments; a single-shot timer applies
+    them once the frame interval has passed, so idle windows do not wake
+    up. Use from the GUI thread, e.g. as the slot of a cross-thread signal.
+    """
+
+    def __init__(self, apply, max_fps=10, parent=None):
+        super().__init__(parent)
+        self.apply = apply
+        self.interval = 1.0 / max_fps
+        self._pending = None
+        self._last_apply = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+        self.submitted = 0
+        self.applied = 0
+
+    def submit(self, *values):
+        self.submitted += 1
+        self._pending = values
+        if self._timer.isActive():
+            return
+        wait = self._last_apply + self.interval - time.monotonic()
+        if wait <= 0:
+            self.flush()
+        else:
+            self._timer.start(int(wait * 1000) + 1)
+
+    def flush(self):
+        if self._pending is None:
+            return
+        values, self._pending = self._pending, None
+        self._last_apply = time.monotonic()
+        self.applied += 1
+        self.apply(*values)
+
+
+class RollingCaptionView(QPlainTextEdit):
+    """Scrolling caption history with a live last line
+
+    add_caption() is cheap and never touches the document: every caption
+    commits the live line to history and becomes the new live line, unless
+    the caller passes replace_live for a newer hypothesis of the same one.
+    Empty captions take a line too, so views shown side by side stay aligned.
+    Rendering runs at most max_fps times a second and only rewrites the live
+    block and appends newly committed lines. History is capped at max_lines
+    both in the deque and in the document.
+    """
+
+    def __init__(self, max_lines=200, max_fps=10, placeholder='', parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.setPlaceholderText(placeholder)
+
+        self.lines = deque(maxlen=max_lines)
+        self.live = ''
+        self._new_lines = deque(maxlen=max_lines)
+        self._has_live = False
+        self._throttle = UpdateThrottle(self._render_captions, max_fps, self)
+
+    def add_caption(self, text, replace_live=False):
+        text = text.strip() if text else ''
+        if self._has_live and not replace_live:
+            self.lines.append(self.live)
+            self._new_lines.append(self.live)
+        self.live = text
+        self._has_live = True
+        self._throttle.submit()
+
+    def set_status(self, text):
+        """Shown only while there are no captions"""
+        self.setPlaceholderText(text)
+
+    def clear_captions(self):
+        self.lines.clear()
+        self._new_lines.clear()
+        self.live = ''
+        self._has_live = False
+        self.clear()
+
+    def _render_captions(self):
+        scrollbar = self.verticalScrollBar()
+        follow = scrollbar.value() >= scrollbar.maximum() - 2
+
+        # The last block always holds the live line; replace it in place
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.End)
+        cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        while self._new_lines:
+            cursor.insertText(self._new_lines.popleft())
+            cursor.insertBlock()
+        cursor.insertText(self.live)
+        cursor.endEditBlock()
+
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def stats(self):
+        return {
+            'lines': len(self.lines),
+            'updates': self._throttle.submitted,
+            'renders': self._throttle.applied,
+        }
@@ -1,3 +1,4 @@
+import os
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QVBoxLayout, QWidget
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject
@@ -5,10 +6,12 @@ from PyQt5.QtGui import QFont, QPalette, QColor
 from socketio import Client
 import threading
 import logging
+from caption_view import RollingCaptionView
 
 
+# DEBUG logs every caption payload; keep it off unless asked for
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.environ.get('CAPTION_LOG_LEVEL', 'INFO'),
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -17,11 +20,12 @@ class SocketThread(QObject):
     transcription_received = pyqtSignal(str, str)
     connection_status = pyqtSignal(bool)
 
-    def __init__(self):
+    def __init__(self, debug_transport=False):
         super().__init__()
+        # socket.io/engine.io packet logging formats every frame; opt-in only
         self.socketio = Client(
-            logger=True,
-            engineio_logger=True,
+            logger=debug_transport,
+            engineio_logger=debug_transport,
             reconnection=True,
             reconnection_attempts=5,
             reconnection_delay=1
@@ -41,23 +45,20 @@ class SocketThread(QObject):
 
         @self.socketio.on('*')
         def catch_all(event, data):
-            logger.debug(f"Received event {event}: {data}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Received event {event}: {data}")
 
         @self.socketio.on('transcription_update')
         def on_transcription(data):
-            logger.info(f"Received transcription update: {data}")
+            # Hot path: the f-string is only built when DEBUG is enabled
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Received transcription update: {data}")
             try:
                 if isinstance(data, dict):
-                    transcription = data.get('transcription', '')
-                    translation = data.get('translation', '')
-                    
-                    logger.debug(f"Processing transcription: {transcription}")
-                    logger.debug(f"Processing translation: {translation}")
-                    
-                    # Emit the signal in the main thread
+                    # Emit the signal in the main thread; the views throttle repaints
                     self.transcription_received.emit(
-                        transcription or 'Waiting for speech...',
-                        translation or 'Translation will appear here...'
+                        data.get('transcription') or '',
+                        data.get('translation') or ''
                     )
             except Exception as e:
                 logger.error(f"Error processing transcription update: {e}", exc_info=True)
@@ -102,14 +103,15 @@ class CaptionWindow(QMainWindow):
         palette.setColor(QPalette.Window, QColor('#f0f0f0'))
         self.setPalette(palette)
 
-        self.transcription_label = QLabel('Waiting for speech...')
-        self.translation_label = QLabel('Translation will appear here...')
+        max_fps = float(os.environ.get('CAPTION_MAX_FPS', 10))
+        self.transcription_view = RollingCaptionView(
+            max_fps=max_fps, placeholder='Waiting for speech...')
+        self.translation_view = RollingCaptionView(
+            max_fps=max_fps, placeholder='Translation will appear here...')
 
-        for label in (self.transcription_label, self.translation_label):
-            label.setWordWrap(True)
-            label.setAlignment(Qt.AlignCenter)
-            label.setStyleSheet("""
-                QLabel {
+        for view in (self.transcription_view, self.translation_view):
+            view.setStyleSheet("""
+                QPlainTextEdit {
                     background-color: white;
                     border: 1px solid #ccc;
                     border-radius: 8px;
@@ -117,11 +119,11 @@ class CaptionWindow(QMainWindow):
                     font-size: 16px;
                 }
             """)
-            label.setMinimumHeight(80)
+            view.setMinimumHeight(80)
 
             font = QFont()
             font.setPointSize(12)
-            label.setFont(font)
+            view.setFont(font)
 
         transcription_header = QLabel('English Transcription')
         translation_header = QLabel('Translation')
@@ -133,9 +135,9 @@ class CaptionWindow(QMainWindow):
             header.setFont(font)
 
         layout.addWidget(transcription_header)
-        layout.addWidget(self.transcription_label)
+        layout.addWidget(self.transcription_view)
         layout.addWidget(translation_header)
-        layout.addWidget(self.translation_label)
+        layout.addWidget(self.translation_view)
 
         self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool)
 
@@ -162,11 +164,14 @@ class CaptionWindow(QMainWindow):
 
     def update_labels(self, transcription, translation):
         try:
-            logger.debug(f"Updating labels - Transcription: {transcription}")
-            logger.debug(f"Updating labels - Translation: {translation}")
-            
-            self.transcription_label.setText(transcription)
-            self.translation_label.setText(translation)
+            if not transcription and not translation:
+                return
+            # The server only sends final captions, so each payload is a new line. The decision
+            # is made once and applied to both views so line N of one matches line N of the other
+            replace_live = False
+            # Only updates the caption models; repaints happen at most max_fps times a second
+            self.transcription_view.add_caption(transcription, replace_live)
+            self.translation_view.add_caption(translation, replace_live)
         except Exception as e:
             logger.error(f"Error updating labels: {e}", exc_info=True)   
 
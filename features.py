@@ -0,0 +1,140 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class StreamingLogMel:
+    """Incremental Whisper log-mel frontend for overlapping windows
+
+    push() turns newly arrived audio into STFT/mel frames exactly once and
+    keeps the raw log10 mel frames in a mirrored rolling buffer.
+    window_features() then assembles the model input for a window that ends
+    at the newest sample: interior frames are copied from the rolling buffer
+    (one contiguous slice, thanks to the mirroring) into a reused output array,
+    and only the two reflect-padded frames at the window start and the few
+    zero-padded frames at its end are computed on demand.
+
+    The result matches WhisperFeatureExtractor (reflect-centred STFT, periodic
+    Hann window, padding to 30 s, max - 8 clamp, (x + 4) / 4 scaling) up to
+    float rounding. Peak normalization of the window is applied as an additive
+    log offset, so frames can be computed on the raw stream.
+    """
+
+    LOG_FLOOR = -10.0  # log10 of the 1e-10 mel floor
+
+    def __init__(self, mel_filters, n_fft=400, hop_length=160, n_samples=480000,
+                 capacity_frames=None):
+        # mel_filters has shape (n_fft // 2 + 1, n_mels), as in WhisperFeatureExtractor
+        self.mel_filters = np.asarray(mel_filters, dtype=np.float32)
+        self.n_mels = self.mel_filters.shape[1]
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.half = n_fft // 2
+        self.n_frames = n_samples // hop_length
+        self.capacity = capacity_frames or self.n_frames
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+        self._frames = np.full((self.n_mels, 2 * self.capacity), self.LOG_FLOOR, dtype=np.float32)
+        self._output = np.empty((self.n_mels, self.n_frames), dtype=np.float32)
+        self.reset()
+
+    @classmethod
+    def from_feature_extractor(cls, feature_extractor, capacity_frames=None):
+        return cls(
+            feature_extractor.mel_filters,
+            n_fft=feature_extractor.n_fft,
+            hop_length=feature_extractor.hop_length,
+            n_samples=feature_extractor.n_samples,
+            capacity_frames=capacity_frames
+        )
+
+    def reset(self):
+        self.total_samples = 0
+        # Frames 0 and 1 need samples before the stream start, so the stream begins at 2
+        self._next_frame = 2
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._tail_start = 0
+        self.frames_computed = 0
+
+    def log_mel(self, frames):
+        """Raw log10 mel energies (frames, n_mels) for (frames, n_fft) windows of audio"""
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+        return np.log10(np.maximum(power @ self.mel_filters, 1e-10))
+
+    def push(self, audio):
+        """Compute every frame whose full n_fft support has now arrived"""
+        audio = np.asarray(audio, dtype=np.float32)
+        samples = np.concatenate([self._tail, audio])
+        base = self._tail_start
+        self.total_samples += len(audio)
+
+        last_frame = (self.total_samples - self.half) // self.hop_length
+        if last_frame >= self._next_frame:
+            count = last_frame - self._next_frame + 1
+            start = self._next_frame * self.hop_length - self.half - base
+            segment = samples[start:start + (count - 1) * self.hop_length + self.n_fft]
+            frames = sliding_window_view(segment, self.n_fft)[::self.hop_length]
+            mel = self.log_mel(frames).T
+
+            columns = np.arange(self._next_frame, last_frame + 1) % self.capacity
+            self._frames[:, columns] = mel
+            self._frames[:, columns + self.capacity] = mel
+            self._next_frame = last_frame + 1
+            self.frames_computed += count
+
+        keep_from = self._next_frame * self.hop_length - self.half - base
+        self._tail = samples[max(0, keep_from):].copy()
+        self._tail_start = base + max(0, keep_from)
+
+    def window_features(self, window_audio, scale=1.0):
+        """Model-ready (1, n_mels, n_frames) features for the window ending at the newest sample
+
+        Returns None if the window cannot be served from the rolling buffer
+        (misaligned start, too short, or older than the buffer capacity); the
+        caller should then fall back to the regular feature extractor. The
+        returned array is reused by the next call.
+        """
+        num_samples = len(window_audio)
+        start_sample = self.total_samples - num_samples
+        if start_sample < 0 or start_sample % self.hop_length or num_samples < self.n_fft + self.hop_length:
+            return None
+        num_samples = min(num_samples, self.n_frames * self.hop_length)
+
+        first_stream_frame = start_sample // self.hop_length
+        last_interior = (num_samples - self.half) // self.hop_length
+        if (first_stream_frame + 2 < self._next_frame - self.capacity
+                or first_stream_frame + last_interior >= self._next_frame):
+            return None
+
+        offset = 2 * np.log10(scale) if scale != 1.0 else 0.0
+        out = self._output
+        out.fill(self.LOG_FLOOR)
+
+        # Interior frames are copied from the rolling buffer, not recomputed
+        column = (first_stream_frame + 2) % self.capacity
+        out[:, 2:last_interior + 1] = self._frames[:, column:column + last_interior - 1]
+
+        # Window start: Whisper reflect-pads the window, not the stream
+        head = np.concatenate([window_audio[self.half:0:-1], window_audio[:self.n_fft]])
+        out[:, 0:2] = self.log_mel(sliding_window_view(head, self.n_fft)[::self.hop_length][:2]).T
+
+        # Window end: frames reaching past the last sample see zero padding
+        end_frames = min(self.n_frames, -(-(num_samples + self.half) // self.hop_length)) - last_interior - 1
+        if end_frames > 0:
+            start = (last_interior + 1) * self.hop_length - self.half
+            tail = np.zeros((end_frames - 1) * self.hop_length + self.n_fft, dtype=np.float32)
+            available = window_audio[start:num_samples]
+            tail[:len(available)] = available
+            frames = sliding_window_view(tail, self.n_fft)[::self.hop_length]
+            out[:, last_interior + 1:last_interior + 1 + end_frames] = self.log_mel(frames).T
+
+        audio_frames = last_interior + 1 + max(0, end_frames)
+        if offset:
+            out[:, :audio_frames] += offset
+            # Scaling cannot lift energies off the floor
+            np.maximum(out[:, :audio_frames], self.LOG_FLOOR, out=out[:, :audio_frames])
+
+        np.maximum(out, out.max() - 8.0, out=out)
+        out += 4.0
+        out /= 4.0
+        return out[np.newaxis]
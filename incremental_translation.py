@@ -0,0 +1,185 @@
+import re
+import threading
+
+from streaming import split_words
+
+
+# A word closing a sentence, optionally followed by closing quotes or brackets
+SENTENCE_END = re.compile(r'[.!?…]["\')\]]*$')
+CLAUSE_END = re.compile(r'[,;:]["\')\]]*$')
+
+
+def split_units(words, min_clause_words=6, max_unit_words=24):
+    """Split a word list into complete sentence/clause units and the unfinished remainder
+
+    Sentences end at terminal punctuation. Clause punctuation only ends a
+    unit once it holds min_clause_words, so short lists of commas do not
+    fragment the translation; runs without punctuation are cut at
+    max_unit_words.
+    """
+    units = []
+    start = 0
+    for index, word in enumerate(words):
+        length = index - start + 1
+        if (SENTENCE_END.search(word)
+                or (CLAUSE_END.search(word) and length >= min_clause_words)
+                or length >= max_unit_words):
+            units.append(' '.join(words[start:index + 1]))
+            start = index + 1
+    return units, words[start:]
+
+
+class IncrementalTranslator:
+    """Translate ASR output in sentence or clause units instead of raw fragments
+
+    add() appends a fragment and returns a revision number; step(revision)
+    translates whatever has changed since the last step. Complete units are
+    translated exactly once. The unfinished tail is translated provisionally
+    so the caption tracks the latest hypothesis, and that translation is
+    reused if the tail comes back unchanged or later completes as-is.
+
+    A step whose revision was already covered by an earlier step is skipped
+    without calling the model, so a backlog of fragments collapses into one
+    translation of the newest text. A provisional tail whose text was
+    extended while it was being translated is discarded rather than shown.
+
+    Each unit keeps the source language of its fragments; a change of
+    source language closes the tail, so no unit mixes two languages.
+    """
+
+    def __init__(self, translate_many, languages, translate_partial=True,
+                 min_clause_words=6, max_unit_words=24):
+        # translate_many takes [(text, language, source)] and returns translations in
+        # order; source is None unless add() was given one
+        self.translate_many = translate_many
+        self.languages = list(languages)
+        self.translate_partial = translate_partial
+        self.min_clause_words = min_clause_words
+        self.max_unit_words = max_unit_words
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._tail = []
+            self._ready = []
+            self.source = None
+            self.revision = 0
+            self._done = 0
+            self._memo = {}
+
+            self.fragments = 0
+            self.units = 0
+            self.batches = 0
+            self.superseded = 0
+            self.stale_partials = 0
+            self.reused = 0
+
+    def set_languages(self, languages):
+        """Translate into languages from the next step on; text already queued is kept"""
+        with self._lock:
+            self.languages = list(languages)
+            # Memoized tails only hold the old languages
+            self._memo = {}
+
+    def add(self, fragment, source=None):
+        """Append an ASR fragment in language source; returns the revision to pass to step()"""
+        words = split_words(fragment)
+        with self._lock:
+            if not words:
+                return self.revision
+            if source != self.source and self._tail:
+                self._ready.append((' '.join(self._tail), self.source))
+                self._tail = []
+                self.units += 1
+            self.source = source
+            units, self._tail = split_units(
+                self._tail + words, self.min_clause_words, self.max_unit_words
+            )
+            self._ready.extend((unit, source) for unit in units)
+            self.fragments += 1
+            self.units += len(units)
+            self.revision += 1
+            return self.revision
+
+    def flush(self):
+        """Close the unfinished tail as a unit, e.g. at a pause or shutdown
+
+        Returns the new revision, or None if there was nothing to close.
+        """
+        with self._lock:
+            if not self._tail:
+                return None
+            self._ready.append((' '.join(self._tail), self.source))
+            self._tail = []
+            self.units += 1
+            self.revision += 1
+            return self.revision
+
+    def step(self, revision=None):
+        """Translate what changed up to now; returns (text, {language: translation}) or None
+
+        text is the source text of the units translated in this step, plus
+        the tentative tail when partial translation is on. Returns None when the revision is already covered by an earlier step
+        or there is nothing to show.
+        """
+        with self._lock:
+            if revision is not None and revision <= self._done:
+                self.superseded += 1
+                return None
+            revision = self.revision
+            self._done = revision
+            units = self._ready
+            self._ready = []
+            tail = (' '.join(self._tail), self.source) if self.translate_partial and self._tail else None
+            memo = self._memo
+            languages = self.languages
+
+        texts = units + ([tail] if tail else [])
+        if not texts:
+            return None
+
+        # Only texts not already translated as an earlier tail go to the model
+        translated = {}
+        requests = []
+        for text in texts:
+            if text in memo:
+                translated[text] = memo[text]
+                self.reused += 1
+            elif text not in translated:
+                translated[text] = None
+                requests.extend((text[0], language, text[1]) for language in languages)
+        if requests:
+            self.batches += 1
+            results = iter(self.translate_many(requests))
+            for text in list(translated):
+                if translated[text] is None:
+                    translated[text] = {language: next(results) for language in languages}
+
+        with self._lock:
+            # Keep the tail so it can be reused if it comes back unchanged or completes as-is
+            self._memo = {tail: translated[tail]} if tail and languages is self.languages else {}
+            if tail and self.revision != revision:
+                # A newer fragment extended the tail while it was being translated
+                self.stale_partials += 1
+                texts = units
+        if not texts:
+            return None
+
+        translations = {}
+        for language in languages:
+            parts = [translated[text].get(language) for text in texts]
+            translations[language] = ' '.join(part for part in parts if part) or None
+        return ' '.join(text for text, _ in texts), translations
+
+    def stats(self):
+        return {
+            'fragments': self.fragments,
+            'units': self.units,
+            'batches': self.batches,
+            'superseded': self.superseded,
+            'stale_partials': self.stale_partials,
+            'reused': self.reused,
+            'pending_words': len(self._tail),
+        }
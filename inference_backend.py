@@ -0,0 +1,152 @@
+import os
+import logging
+import tempfile
+import threading
+import torch
+
+
+# Thread settings are per process; only the first backend to configure applies them
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class InferenceBackend:
+    """Default backend: models are used exactly as loaded"""
+
+    name = 'torch'
+
+    def configure(self):
+        pass
+
+    def prepare_whisper(self, model):
+        return model
+
+    def prepare_marian(self, model):
+        return model
+
+
+class CPUOptimizedBackend(InferenceBackend):
+    """Dynamic int8 quantization and explicit threading for CPU-only boxes
+
+    Linear layers in both models are quantized to int8 with
+    torch.quantization.quantize_dynamic, which typically doubles decoder
+    throughput on x86 with a small accuracy cost. Optionally the Whisper
+    encoder is exported to ONNX and run with onnxruntime; the decoder stays
+    in (quantized) PyTorch because generate() drives it step by step with a
+    KV cache.
+
+    Without intra_op_threads the process's current torch thread count is
+    kept, e.g. the per-worker share set by batch_transcribe.
+    """
+
+    name = 'cpu'
+
+    def __init__(self, intra_op_threads=None, inter_op_threads=1, quantize=True,
+                 onnx_encoder=False, onnx_cache_dir=None):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.quantize = quantize
+        self.onnx_encoder = onnx_encoder
+        self.onnx_cache_dir = onnx_cache_dir or os.path.join(tempfile.gettempdir(), 'transcriber_onnx')
+        self.name = 'cpu' + ('-int8' if quantize else '') + ('-onnx' if onnx_encoder else '')
+
+    def configure(self):
+        global _configured
+        with _configure_lock:
+            if _configured:
+                return
+            _configured = True
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError:
+            # Can only be set before the first parallel op in the process
+            logging.warning("Inter-op thread count already fixed for this process")
+        logging.info(f"CPU backend: {torch.get_num_threads()} intra-op, "
+                     f"{torch.get_num_interop_threads()} inter-op threads")
+
+    def _quantize(self, model):
+        model = model.float().eval()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def prepare_whisper(self, model):
+        model = model.float().eval()
+        if self.onnx_encoder:
+            model.model.encoder = OnnxWhisperEncoder.from_model(
+                model, self.onnx_cache_dir, self.intra_op_threads or torch.get_num_threads()
+            )
+        if self.quantize:
+            model = self._quantize(model)
+        return model
+
+    def prepare_marian(self, model):
+        return self._quantize(model) if self.quantize else model.float().eval()
+
+
+class OnnxWhisperEncoder(torch.nn.Module):
+    """Drop-in replacement for WhisperEncoder backed by an onnxruntime session"""
+
+    def __init__(self, session, config):
+        super().__init__()
+        self.session = session
+        self.config = config
+        self.input_name = session.get_inputs()[0].name
+        # generate() inspects these on the encoder
+        self.main_input_name = 'input_features'
+
+    @classmethod
+    def from_model(cls, model, cache_dir, threads):
+        import onnxruntime as ort
+
+        os.makedirs(cache_dir, exist_ok=True)
+        name = model.config.name_or_path.replace('/', '_') or 'whisper'
+        path = os.path.join(cache_dir, f"{name}_encoder.onnx")
+
+        if not os.path.exists(path):
+            logging.info(f"Exporting Whisper encoder to {path}")
+            frames = 2 * model.config.max_source_positions
+            dummy = torch.zeros((1, model.config.num_mel_bins, frames), dtype=torch.float32)
+            torch.onnx.export(
+                model.model.encoder,
+                (dummy,),
+                path,
+                input_names=['input_features'],
+                output_names=['last_hidden_state'],
+                dynamic_axes={'input_features': {0: 'batch'}, 'last_hidden_state': {0: 'batch'}},
+                opset_version=17
+            )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        return cls(session, model.config)
+
+    def forward(self, input_features, attention_mask=None, head_mask=None,
+                output_attentions=None, output_hidden_states=None, return_dict=None):
+        from transformers.modeling_outputs import BaseModelOutput
+
+        outputs = self.session.run(
+            None, {self.input_name: input_features.float().cpu().numpy()}
+        )
+        return BaseModelOutput(last_hidden_state=torch.from_numpy(outputs[0]))
+
+
+BACKENDS = {
+    'torch': InferenceBackend,
+    'cpu': lambda: CPUOptimizedBackend(quantize=False),
+    'cpu-int8': CPUOptimizedBackend,
+    'cpu-onnx': lambda: CPUOptimizedBackend(quantize=False, onnx_encoder=True),
+    'cpu-int8-onnx': lambda: CPUOptimizedBackend(onnx_encoder=True),
+}
+
+
+def get_backend(backend=None):
+    """Resolve a backend instance from a name, an instance or TRANSCRIBER_BACKEND"""
+    if isinstance(backend, InferenceBackend):
+        return backend
+    name = backend or os.environ.get('TRANSCRIBER_BACKEND', 'torch')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
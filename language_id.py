@@ -0,0 +1,112 @@
+import torch
+
+
+def language_token_ids(whisper_model):
+    """{language code: token id} for Whisper's <|xx|> language tokens"""
+    lang_to_id = getattr(whisper_model.generation_config, 'lang_to_id', None) or {}
+    return {token.strip('<|>'): token_id for token, token_id in lang_to_id.items()}
+
+
+def encode(whisper_model, input_features):
+    """Full-length encoder pass, returned in the form generate() takes as encoder_outputs"""
+    from transformers.modeling_outputs import BaseModelOutput
+
+    hidden_states = whisper_model.get_encoder()(input_features, return_dict=True).last_hidden_state
+    return BaseModelOutput(last_hidden_state=hidden_states)
+
+
+def detect_languages(whisper_model, encoder_outputs, token_ids, candidates=None, indices=None):
+    """Language probabilities for each window from one decoder step
+
+    This is what Whisper's own language detection does, but on encoder
+    outputs that are then reused for transcription, so the encoder runs
+    once. candidates restricts the softmax to a subset of languages and
+    indices to some of the windows. Returns one {language: probability}
+    dict per window.
+    """
+    from transformers.modeling_outputs import BaseModelOutput
+
+    codes = [c for c in (candidates or token_ids) if c in token_ids]
+    hidden_states = encoder_outputs.last_hidden_state
+    if indices is not None and len(indices) < hidden_states.shape[0]:
+        hidden_states = hidden_states[indices]
+        encoder_outputs = BaseModelOutput(last_hidden_state=hidden_states)
+    decoder_input_ids = torch.full(
+        (hidden_states.shape[0], 1),
+        whisper_model.generation_config.decoder_start_token_id,
+        dtype=torch.long,
+        device=hidden_states.device
+    )
+    with torch.no_grad():
+        logits = whisper_model(
+            encoder_outputs=encoder_outputs, decoder_input_ids=decoder_input_ids
+        ).logits[:, -1]
+    probs = torch.softmax(logits[:, [token_ids[c] for c in codes]].float(), dim=-1).cpu().numpy()
+    return [dict(zip(codes, row.tolist())) for row in probs]
+
+
+class LanguagePrior:
+    """Running belief about one stream's source language
+
+    Detections are smoothed, and once the same language has led with at
+    least `confidence` for `stable_after` detections in a row the speaker
+    counts as stable: detection is skipped and the prior's language used,
+    except for a recheck every `recheck_interval` segments so a switch is
+    still noticed.
+    """
+
+    def __init__(self, smoothing=0.5, confidence=0.8, stable_after=3, recheck_interval=5):
+        self.smoothing = smoothing
+        self.confidence = confidence
+        self.stable_after = stable_after
+        self.recheck_interval = recheck_interval
+        self.reset()
+
+    def reset(self):
+        self.language = None
+        self.probs = {}
+        self.streak = 0
+        self.since_detection = 0
+
+        self.detections = 0
+        self.skipped = 0
+        self.switches = 0
+
+    def needs_detection(self):
+        return (self.language is None
+                or self.streak < self.stable_after
+                or self.since_detection >= self.recheck_interval)
+
+    def observe(self, probs):
+        """Fold in one detection; returns the language to decode with"""
+        if self.probs:
+            probs = {
+                language: self.smoothing * self.probs.get(language, 0.0) + (1 - self.smoothing) * p
+                for language, p in probs.items()
+            }
+        self.probs = probs
+        language = max(probs, key=probs.get)
+        if language != self.language:
+            if self.language is not None:
+                self.switches += 1
+            self.language = language
+            self.streak = 0
+        self.streak = self.streak + 1 if probs[language] >= self.confidence else 0
+        self.since_detection = 0
+        self.detections += 1
+        return language
+
+    def skip(self):
+        """Use the prior instead of detecting; returns its language"""
+        self.since_detection += 1
+        self.skipped += 1
+        return self.language
+
+    def stats(self):
+        return {
+            'language': self.language,
+            'confidence': self.probs.get(self.language, 0.0) if self.language else 0.0,
+            'detections': self.detections,
+            'skipped': self.skipped,
+            'switches': self.switches,
+        }
@@ -1,31 +1,103 @@
+import os
 import torch
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, MarianMTModel, MarianTokenizer
-import sounddevice as sd
 import numpy as np
 import threading
-import queue
 import time
 import logging
 import traceback
+from model_manager import get_model_manager
+from streaming import LocalAgreement
+from vad import VoiceActivityDetector, UtteranceSegmenter
+from ring_buffer import AudioRingBuffer
+from audio_source import DeviceSource
+from pipeline import Pipeline, PipelineStage
+from translation_cache import get_translation_cache, COMMON_PHRASES
+from metrics import MetricsRegistry, MetricsServer
+from inference_backend import get_backend
+from scheduler import AdaptiveScheduler, DECODING_PROFILES
+from features import StreamingLogMel
+from incremental_translation import IncrementalTranslator
+from short_context import context_frames, supports_short_context, encode_short_context
+from language_id import language_token_ids, encode, detect_languages, LanguagePrior
+from tracing import get_tracer
 
 # Set up logging
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.environ.get('CAPTION_LOG_LEVEL', 'INFO'),
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
 class ContinuousTranscriber:
-    def __init__(self, target_language='en'):
-        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        logging.info(f"Using device: {self.device}")
+    def __init__(self, target_language='en', model_manager=None, streaming=False,
+                 hop_duration=0.5, max_window_duration=8.0, window_overlap=1.0,
+                 use_vad=True, max_utterance_duration=5.0, buffer_capacity_duration=30.0,
+                 pipelined=False, stage_queue_size=4, stage_policies=None,
+                 translation_cache_path='translation_cache.db', target_languages=None,
+                 backend=None, latency_target=None, short_context=False,
+                 context_granularity=1.0, incremental_translation=False, audio_buffer=None,
+                 audio_source=None, source_language='en', source_languages=None,
+                 mt_batch_size=8, mt_batch_wait=0.02):
+        # Inference backend: 'torch' (default), 'cpu-int8', 'cpu-onnx', ... or an instance
+        self.backend = get_backend(backend)
+        self.backend.configure()
+        use_cuda = torch.cuda.is_available() and not self.backend.name.startswith('cpu')
+        self.device = "cuda:0" if use_cuda else "cpu"
+        logging.info(f"Using device: {self.device} with {self.backend.name} backend")
         
         self.sample_rate = 16000
-        self.buffer = queue.Queue()
+        # Per-segment spans; a no-op unless tracing is enabled (CAPTION_TRACE)
+        self.tracer = get_tracer()
+        # Preallocated SPSC ring buffer; drops oldest audio if processing falls behind.
+        # audio_buffer can supply one with the same interface, e.g. a SharedAudioRing
+        self.buffer = audio_buffer or AudioRingBuffer(int(self.sample_rate * buffer_capacity_duration))
         self.running = False
+        # Where audio comes from: local device by default, or a WavSource/NetworkSource
+        self.source = audio_source
         self.buffer_duration = 2  # seconds
         self.samples_per_chunk = int(self.sample_rate * self.buffer_duration)
         self.callback_function = None
+        self.partial_callback_function = None
+        self.multi_callback_function = None
         self.min_audio_level = 0.01
+
+        # Streaming mode: rolling window decoded every hop, committed by local agreement
+        self.streaming = streaming
+        self.hop_duration = hop_duration
+        self.max_window_duration = max_window_duration
+        self.window_overlap = window_overlap
+        self.agreement = LocalAgreement()
+
+        # Voice activity detection keeps silence and noise away from Whisper
+        self.vad = VoiceActivityDetector(sample_rate=self.sample_rate) if use_vad else None
+        self.segmenter = UtteranceSegmenter(
+            self.vad,
+            sample_rate=self.sample_rate,
+            max_utterance_duration=max_utterance_duration
+        ) if use_vad else None
+        self.max_utterance_duration = max_utterance_duration
+        self._init_metrics()
+
+        # Decoding settings; the adaptive scheduler swaps profiles to meet latency_target.
+        # reconfigure() overrides apply on top of whichever profile is active
+        self.profile = DECODING_PROFILES[0]
+        self.decoding_overrides = {}
+        self.decoding = self.profile
+        self.scheduler = AdaptiveScheduler(
+            latency_target, on_switch=lambda old, new: self._mode_switches.inc()
+        ) if latency_target else None
+
+        # Pipelined mode: ASR, translation and delivery run on their own workers
+        self.pipelined = pipelined
+        self.stage_queue_size = stage_queue_size
+        self.stage_policies = {'asr': 'block', 'mt': 'coalesce', 'delivery': 'coalesce'}
+        self.stage_policies.update(stage_policies or {})
+        self.pipeline = None
+        # Queued transcriptions are translated together, up to mt_batch_size at a time;
+        # the translation stage waits up to mt_batch_wait for a batch to fill when behind
+        self.mt_batch_size = mt_batch_size
+        self.mt_batch_wait = mt_batch_wait
+        # Rows per Marian generate(); requests are bucketed by length up to this size
+        self.mt_max_rows = 32
         
         # Language mapping for ROMANCE model
         # These are the languages supported by the ROMANCE model
@@ -49,50 +121,274 @@ class ContinuousTranscriber:
             'ca': 'ca_ES'
         }
         
-        # Validate and set target language
-        self.target_language = self._validate_language(target_language)
-        logging.info(f"Target language set to: {self.target_language}")
+        # Source language: 'en', another Whisper language, or 'auto' to detect it per
+        # utterance, optionally restricted to source_languages
+        self.source_language = source_language
+        self.source_candidates = list(source_languages) if source_languages else None
+        self.default_source = 'en' if source_language == 'auto' else source_language
+
+        # Validate and set target languages; the first one is the primary target
+        # delivered to the single-translation callback
+        self.target_language, self.target_languages = self._resolve_targets(
+            target_language, target_languages
+        )
+        logging.info(f"Target languages set to: {self.target_languages or ['en']}")
         
+        # Models are shared through the process-wide manager so that
+        # recreating a transcriber (e.g. on language change) does not reload them
+        self.model_manager = model_manager or get_model_manager()
+        self._model_keys = []
+
+        # Changes requested by reconfigure() while running, applied between segments
+        self._pending_config = None
+        self._config_lock = threading.Lock()
+
         # Initialize Whisper model for transcription
         logging.info("Loading Whisper model...")
         self.model_id = "openai/whisper-small"
         
-        self.dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+        self.dtype = torch.float16 if use_cuda else torch.float32
         logging.info(f"Using dtype: {self.dtype}")
         
         try:
-            self.whisper_model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                self.model_id,
-                torch_dtype=self.dtype,
-                device_map="auto",
-                use_safetensors=True
+            whisper_key = ('whisper', self.model_id, str(self.dtype), self.backend.name)
+            self.whisper_model, self.processor = self.model_manager.acquire(
+                whisper_key, self._load_whisper
             )
-            self.processor = AutoProcessor.from_pretrained(self.model_id)
+            self._model_keys.append(whisper_key)
             logging.info("Whisper model loaded successfully")
+            
+            # Incremental log-mel frontend so overlapping stream windows reuse frames
+            feature_extractor = getattr(self.processor, 'feature_extractor', None)
+            self.frontend = StreamingLogMel.from_feature_extractor(
+                feature_extractor
+            ) if streaming and hasattr(feature_extractor, 'mel_filters') else None
+            self.frontend_fallbacks = 0
+            
+            # Opt-in: encode only the frames actually present instead of 30 s of padding
+            self.short_context = short_context and supports_short_context(self.whisper_model)
+            if short_context and not self.short_context:
+                logging.warning("Whisper encoder does not support short context, using padded input")
+            self.context_granularity_frames = int(context_granularity * 100)
+            
+            # Language ID reuses the transcription encoder pass: one extra decoder step
+            self.language_tokens = language_token_ids(self.whisper_model) if source_language == 'auto' else {}
+            self.explicit_encoder = hasattr(self.whisper_model, 'get_encoder')
+            self.detect_source = bool(self.language_tokens) and self.explicit_encoder
+            if source_language == 'auto' and not self.detect_source:
+                logging.warning("Whisper model cannot detect languages, assuming English speech")
+            self.language_prior = self.new_language_prior()
         except Exception as e:
             logging.error(f"Error loading Whisper model: {str(e)}")
             raise
 
         # Initialize Helsinki-NLP ROMANCE translation model
-        if self.target_language != 'en':
-            try:
-                self.translation_model_name = "Helsinki-NLP/opus-mt-en-ROMANCE"
-                logging.info(f"Loading translation model: {self.translation_model_name}")
-                self.translation_model = MarianMTModel.from_pretrained(
-                    self.translation_model_name
-                ).to(self.device)
-                self.translation_tokenizer = MarianTokenizer.from_pretrained(
-                    self.translation_model_name
-                )
-                logging.info("Translation model loaded successfully")
-            except Exception as e:
-                logging.error(f"Error loading translation model: {str(e)}")
-                self.translation_model = None
-                self.translation_tokenizer = None
+        self.translation_model_name = "Helsinki-NLP/opus-mt-en-ROMANCE"
+        self.translation_model = None
+        self.translation_tokenizer = None
+        self.translation_cache = None
+        self.translation_cache_path = translation_cache_path
+        # Other source/target pairs get their own Marian model, loaded on first use
+        self.translation_models = {}
+        self._missing_translation_models = set()
+        self._translation_models_lock = threading.Lock()
+        self.incremental_translation = incremental_translation
+        self.incremental = None
+        self._preload_translation(self.target_languages)
+        if self.translation_cache_path:
+            self.translation_cache = get_translation_cache(self.translation_cache_path)
+        self._init_incremental()
 
         self.processing_thread = None
         self.stream = None
 
+    def _load_translation_model(self):
+        """Acquire the Marian model; returns False if it could not be loaded"""
+        if self.translation_model is not None:
+            return True
+        try:
+            logging.info(f"Loading translation model: {self.translation_model_name}")
+            translation_key = ('marian', self.translation_model_name, self.device, self.backend.name)
+            self.translation_model, self.translation_tokenizer = self.model_manager.acquire(
+                translation_key, self._load_translation
+            )
+            self._model_keys.append(translation_key)
+            self.translation_models[self.translation_model_name] = (
+                self.translation_model, self.translation_tokenizer
+            )
+            logging.info("Translation model loaded successfully")
+            return True
+        except Exception as e:
+            logging.error(f"Error loading translation model: {str(e)}")
+            self.translation_model = None
+            self.translation_tokenizer = None
+            return False
+
+    def _preload_translation(self, languages):
+        """Load the English->ROMANCE model up front if English speech may need it"""
+        if self.source_language in ('en', 'auto') and any(l != 'en' for l in languages):
+            return self._load_translation_model()
+        return True
+
+    def _get_translation_model(self, model_name):
+        """(model, tokenizer) for a Marian model, loading it on first use; None if unavailable"""
+        loaded = self.translation_models.get(model_name)
+        if loaded is not None or model_name in self._missing_translation_models:
+            return loaded
+        with self._translation_models_lock:
+            if model_name in self.translation_models or model_name in self._missing_translation_models:
+                return self.translation_models.get(model_name)
+            key = ('marian', model_name, self.device, self.backend.name)
+            try:
+                logging.info(f"Loading translation model: {model_name}")
+                loaded = self.model_manager.acquire(key, lambda: self._load_translation(model_name))
+                self._model_keys.append(key)
+                self.translation_models[model_name] = loaded
+            except Exception as e:
+                # Not every pair has a model; remember so each segment does not retry
+                logging.error(f"Error loading translation model {model_name}: {str(e)}")
+                self._missing_translation_models.add(model_name)
+            return loaded
+
+    def _translation_route(self, source, language):
+        """(Marian model name, input prefix) for source -> language, or None if nothing to translate"""
+        if not source or source == language:
+            return None
+        if source == 'en':
+            target_lang_code = self.romance_language_codes.get(language)
+            if not target_lang_code:
+                logging.error(f"Unsupported target language: {language}")
+                return None
+            # The ROMANCE model picks the output language from a >>xx_XX<< prefix
+            return self.translation_model_name, f">>{target_lang_code}<< "
+        if language == 'en' and source in self.romance_language_codes:
+            return "Helsinki-NLP/opus-mt-ROMANCE-en", ""
+        return f"Helsinki-NLP/opus-mt-{source}-{language}", ""
+
+    def new_language_prior(self):
+        """A fresh per-stream language prior, or None when the source language is fixed"""
+        return LanguagePrior() if self.detect_source else None
+
+    def _init_incremental(self):
+        # Translate sentence/clause units instead of every ASR fragment. Not done
+        # while running: the loops and pipeline stages pick their mode at start
+        if self.incremental_translation and self.incremental is None and self.target_languages:
+            self.incremental = IncrementalTranslator(self._translate_many, self.target_languages)
+
+    def _load_whisper(self):
+        # Imported on first load; transformers alone takes seconds to import
+        from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor
+
+        model = AutoModelForSpeechSeq2Seq.from_pretrained(
+            self.model_id,
+            torch_dtype=self.dtype,
+            device_map="auto" if self.device != "cpu" else None,
+            use_safetensors=True
+        )
+        processor = AutoProcessor.from_pretrained(self.model_id)
+        return self.backend.prepare_whisper(model), processor
+
+    def _load_translation(self, model_name=None):
+        from transformers import MarianMTModel, MarianTokenizer
+
+        model_name = model_name or self.translation_model_name
+        model = MarianMTModel.from_pretrained(
+            model_name
+        ).to(self.device)
+        tokenizer = MarianTokenizer.from_pretrained(
+            model_name
+        )
+        return self.backend.prepare_marian(model), tokenizer
+
+    def _init_metrics(self):
+        self.metrics = MetricsRegistry(prefix='transcriber_')
+        self.metrics_server = None
+        self._skipped_silent = self.metrics.counter(
+            'chunks_skipped_silent_total', 'Audio chunks not sent to Whisper because no speech was detected')
+        self._buffer_timeouts = self.metrics.counter(
+            'buffer_timeouts_total', 'Buffer collection timeouts while waiting for audio')
+        self._audio_seconds = self.metrics.counter(
+            'audio_seconds_total', 'Seconds of audio sent to Whisper')
+        self._processing_seconds = self.metrics.counter(
+            'processing_seconds_total', 'Seconds spent in Whisper and Marian inference')
+        self._asr_latency = self.metrics.histogram(
+            'asr_latency_seconds', 'Whisper feature extraction and decoding time per call')
+        self._mt_latency = self.metrics.histogram(
+            'mt_latency_seconds', 'Marian translation time per call')
+        self._mt_generate_calls = self.metrics.counter(
+            'mt_generate_calls_total', 'Marian generate calls, excluding cache hits')
+        self._mt_batch_rows = self.metrics.histogram(
+            'mt_batch_rows', 'Requests per Marian generate call',
+            buckets=(1, 2, 4, 8, 16, 32, 64))
+        self._language_detections = self.metrics.counter(
+            'language_detections_total', 'Windows whose source language was detected')
+        self._language_detections_skipped = self.metrics.counter(
+            'language_detections_skipped_total', 'Windows decoded with the stream language prior instead')
+        self.metrics.gauge(
+            'buffer_depth_samples', 'Unread samples in the audio ring buffer',
+            fn=lambda: self.buffer.depth())
+        self.metrics.gauge(
+            'samples_dropped_total', 'Samples dropped by the ring buffer overflow policy',
+            fn=lambda: self.buffer.dropped_samples)
+        self._mode_switches = self.metrics.counter(
+            'decoding_mode_switches_total', 'Adaptive decoding profile changes')
+        self.metrics.gauge(
+            'decoding_level', 'Current adaptive decoding level, 0 is full quality',
+            fn=lambda: self.scheduler.level if self.scheduler else 0)
+        self.metrics.gauge(
+            'real_time_factor', 'Inference time divided by audio duration',
+            fn=lambda: (self._processing_seconds.value / self._audio_seconds.value
+                        if self._audio_seconds.value else 0.0))
+
+    @property
+    def chunks_skipped_silent(self):
+        return self._skipped_silent.value
+
+    def metrics_snapshot(self):
+        """Return current counters, gauges and histogram summaries as a dict"""
+        snapshot = self.metrics.snapshot()
+        if self.pipeline is not None:
+            snapshot['pipeline'] = self.pipeline.stats()
+        if self.scheduler is not None:
+            snapshot['scheduler'] = self.scheduler.stats()
+        if self.incremental is not None:
+            snapshot['incremental_translation'] = self.incremental.stats()
+        if self.language_prior is not None:
+            snapshot['source_language'] = self.language_prior.stats()
+        if self.tracer.enabled:
+            snapshot['tracing'] = self.tracer.stats()
+        if self.translation_cache is not None:
+            snapshot['translation_cache'] = self.translation_cache.stats()
+        return snapshot
+
+    def export_trace(self, path):
+        """Write recorded spans as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        count = self.tracer.export_chrome(path)
+        logging.info(f"Wrote {count} trace spans to {path}")
+        return count
+
+    def start_metrics_server(self, port=9100, host='127.0.0.1'):
+        """Serve metrics in Prometheus text format on http://host:port/metrics"""
+        if self.metrics_server is None:
+            self.metrics_server = MetricsServer(self.metrics, host=host, port=port)
+            self.metrics_server.start()
+        return self.metrics_server
+
+    def close(self):
+        """Stop transcription and hand model references back to the manager"""
+        self.stop_transcription()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        trace_path = os.environ.get('CAPTION_TRACE_FILE')
+        if trace_path and self.tracer.recorded:
+            self.export_trace(trace_path)
+        if self.translation_cache is not None:
+            self.translation_cache.flush()
+        for key in self._model_keys:
+            self.model_manager.release(key)
+        self._model_keys = []
+
     def _validate_language(self, language_code):
         """Validate language code and return normalized version"""
         # First check if it's a valid language code
@@ -107,6 +403,22 @@ class ContinuousTranscriber:
         logging.warning(f"Invalid language code '{language_code}', defaulting to English")
         return 'en'
 
+    def _resolve_targets(self, target_language, target_languages=None):
+        """Validate the requested targets; returns (primary language, translation languages)
+
+        English is only a translation target when the speech may be in another language.
+        """
+        keep_english = self.source_language != 'en'
+        if target_languages:
+            languages = []
+            for language in target_languages:
+                code = self._validate_language(language)
+                if (code != 'en' or keep_english) and code not in languages:
+                    languages.append(code)
+            return (languages[0] if languages else 'en'), languages
+        primary = self._validate_language(target_language)
+        return primary, ([] if primary == 'en' and not keep_english else [primary])
+
     def _get_language_name(self, language_code):
         """Get full language name from code"""
         try:
@@ -115,186 +427,796 @@ class ContinuousTranscriber:
         except StopIteration:
             return language_code
 
-    def _translate_text(self, text):
-        """Translate text using Helsinki-NLP ROMANCE model"""
-        if not text or self.target_language == 'en' or not self.translation_model:
+    def _translate_text(self, text, source=None):
+        """Translate text into the primary target language"""
+        if not text or self.target_language not in self.target_languages:
             return None
-            
-        try:
-            # Get the appropriate target language code for the ROMANCE model
-            target_lang_code = self.romance_language_codes.get(self.target_language)
-            if not target_lang_code:
-                logging.error(f"Unsupported target language: {self.target_language}")
-                return None
+        return self._translate_many([(text, self.target_language, source)])[0]
+
+    def _translate_all(self, text, source=None):
+        """Translate text into every target language in one batch; returns {language: translation}"""
+        if not text or not self.target_languages:
+            return {}
+        return self._translate_batch([(text, source)])[0]
+
+    def _translate_batch(self, items):
+        """Translate (text, source) items into every target language together; one dict per item"""
+        # Read once; reconfigure() may swap the list between segments
+        languages = self.target_languages
+        if not languages:
+            return [{} for _ in items]
+        translations = self._translate_many(
+            [(text, lang, source) for text, source in items for lang in languages]
+        )
+        count = len(languages)
+        return [
+            dict(zip(languages, translations[i * count:(i + 1) * count]))
+            for i in range(len(items))
+        ]
+
+    def _length_buckets(self, pending):
+        """Split pending requests into batches of similar input length
+
+        Marian pads every row to the longest input in the batch, so a short
+        sentence batched with a long one costs as much as the long one.
+        Requests are sorted by length and a new bucket starts once an input
+        is more than twice the shortest in the bucket, or the bucket is full.
+        """
+        ordered = sorted(pending, key=lambda request: len(request[3]))
+        buckets = []
+        for request in ordered:
+            length = len(request[3])
+            if (not buckets or len(buckets[-1]) >= self.mt_max_rows
+                    or length > 2 * len(buckets[-1][0][3]) + 16):
+                buckets.append([])
+            buckets[-1].append(request)
+        return buckets
+
+    def _translate_many(self, requests, use_cache=True):
+        """Translate (text, language) or (text, language, source) requests in length-bucketed padded batches per model
+
+        Requests without a source use the configured source language. The
+        ROMANCE model picks the output language from a >>xx_XX<< prefix, so
+        English text for different targets shares a batch; other pairs are
+        routed to their own Marian model. Returns translations in request
+        order, with None for requests that could not (or need not) be
+        translated.
+        """
+        results = [None] * len(requests)
+
+        batches = {}
+        for index, request in enumerate(requests):
+            text, language = request[0], request[1]
+            source = (request[2] if len(request) > 2 else None) or self.default_source
+            if not text:
+                continue
+            route = self._translation_route(source, language)
+            if route is None:
+                continue
+            model_name, prefix = route
+
+            if use_cache and self.translation_cache is not None:
+                cached = self.translation_cache.get(text, language, model_name)
+                if cached is not None:
+                    results[index] = cached
+                    continue
 
             # Prepare the input text with the target language code
-            input_text = f">>{target_lang_code}<< {text}"
-            
+            batches.setdefault(model_name, []).append((index, text, language, prefix + text))
+
+        for model_name, requests_for_model in batches.items():
+            loaded = self._get_translation_model(model_name)
+            if loaded is None:
+                continue
+            translation_model, translation_tokenizer = loaded
+            for pending in self._length_buckets(requests_for_model):
+                self._generate_translations(model_name, translation_model, translation_tokenizer,
+                                            pending, results, use_cache)
+
+        return results
+
+    def _generate_translations(self, model_name, translation_model, translation_tokenizer,
+                               pending, results, use_cache):
+        """One padded generate() over pending (index, text, language, input) requests, written into results"""
+        try:
+            start_time = time.time()
+            trace_start = time.perf_counter_ns()
             # Tokenize and translate
-            inputs = self.translation_tokenizer(
-                input_text, 
+            inputs = translation_tokenizer(
+                [input_text for _, _, _, input_text in pending], 
                 return_tensors="pt", 
                 padding=True
             ).to(self.device)
             
             with torch.no_grad():
-                translated_ids = self.translation_model.generate(
+                translated_ids = translation_model.generate(
                     **inputs,
-                    max_length=512,
-                    num_beams=4,
+                    max_length=self.decoding['mt_max_length'],
+                    num_beams=self.decoding['mt_beams'],
                     length_penalty=0.6,
                     early_stopping=True
                 )
             
-            # Decode translation
-            translation = self.translation_tokenizer.decode(
-                translated_ids[0], 
+            # Decode translations
+            translations = translation_tokenizer.batch_decode(
+                translated_ids, 
                 skip_special_tokens=True
             )
-            return translation
+            self.tracer.record('translate', trace_start)
+            elapsed = time.time() - start_time
+            self._mt_generate_calls.inc()
+            self._mt_batch_rows.observe(len(pending))
+            self._mt_latency.observe(elapsed)
+            self._processing_seconds.inc(elapsed)
+            for (index, text, language, _), translation in zip(pending, translations):
+                results[index] = translation
+                if use_cache and self.translation_cache is not None and translation:
+                    self.translation_cache.put(text, language, model_name, translation)
             
         except Exception as e:
-            logging.error(f"Translation error: {str(e)}")
-            return None
+            logging.error(f"Translation error ({model_name}): {str(e)}")
 
-    def process_audio_chunk(self, audio_data):
+    def warm_up(self, duration=1.0):
+        """Run one dummy Whisper and Marian inference so the first real chunk is not slow
+
+        The first call pays for kernel selection, allocator growth and lazy
+        initialization inside the models. The translation cache is then
+        prewarmed with common phrases. Returns the time spent in seconds.
+        """
+        start_time = time.time()
         try:
-            # Check audio level
-            audio_level = np.max(np.abs(audio_data))
-            if audio_level < self.min_audio_level:
-                logging.debug(f"Audio level too low: {audio_level}")
-                return None, None
-            
-            # Normalize audio
-            audio_data = audio_data / audio_level
-            
-            # Create input features
-            inputs = self.processor(
-                audio_data, 
-                sampling_rate=self.sample_rate, 
-                return_tensors="pt"
+            self._transcribe_batch([np.zeros(int(self.sample_rate * duration), dtype=np.float32)])
+            if self.target_languages:
+                # Bypass the cache so the model itself runs
+                self._translate_many([("Hello.", self.target_language)], use_cache=False)
+            self.prewarm_translation_cache()
+        except Exception as e:
+            logging.error(f"Warm-up failed: {str(e)}")
+            logging.error(traceback.format_exc())
+        elapsed = time.time() - start_time
+        logging.info(f"Warm-up finished in {elapsed:.2f}s")
+        return elapsed
+
+    def prewarm_translation_cache(self, phrases=None):
+        """Fill the translation cache with common phrases for every target language"""
+        if self.translation_cache is None or (phrases is None and self.default_source != 'en'):
+            # The built-in phrases are English
+            return 0
+        added = 0
+        for language in self.target_languages:
+            route = self._translation_route(self.default_source, language)
+            if route is None or self._get_translation_model(route[0]) is None:
+                continue
+            # The cache stores the results; bypass it so nothing is counted or written twice
+            added += self.translation_cache.prewarm(
+                phrases or COMMON_PHRASES,
+                lambda texts, language=language: self._translate_many(
+                    [(text, language) for text in texts], use_cache=False
+                ),
+                language,
+                route[0]
             )
+        return added
+
+    def _transcribe_audio(self, audio_data):
+        """Run Whisper on a window of audio and return the stripped text"""
+        return self._transcribe_segment(audio_data)[0]
+
+    def _transcribe_segment(self, audio_data, features=None):
+        """Transcribe a window of this stream; returns (text, source language)"""
+        texts, languages = self._decode_batch([audio_data], features, [self.language_prior])
+        return texts[0], languages[0]
+
+    def _transcribe_batch(self, audio_batch, features=None, priors=None):
+        """Run Whisper on several windows in one generate call; returns one text per window"""
+        return self._decode_batch(audio_batch, features, priors)[0]
+
+    def _decode_batch(self, audio_batch, features=None, priors=None):
+        """Run Whisper on several windows in one generate call; returns (texts, source languages)
+
+        features may carry precomputed log-mel input for the batch, e.g. from
+        the streaming frontend; otherwise the processor computes it. With
+        source_language='auto', priors holds the LanguagePrior of the stream
+        each window belongs to (None to always detect).
+        """
+        start_time = time.time()
+        tracer = self.tracer
+        with tracer.span('features'):
+            if features is None:
+                # Normalize audio
+                normalized = []
+                for audio_data in audio_batch:
+                    audio_level = np.max(np.abs(audio_data))
+                    normalized.append(audio_data / audio_level if audio_level > 0 else audio_data)
+                
+                # Create input features
+                features = self.processor(
+                    normalized, 
+                    sampling_rate=self.sample_rate, 
+                    return_tensors="pt"
+                ).input_features
+            else:
+                features = torch.from_numpy(features)
             
             # Move to device and set dtype
-            input_features = inputs.input_features.to(self.device).to(self.dtype)
+            input_features = features.to(self.device).to(self.dtype)
+        
+        # Create attention mask
+        attention_mask = torch.ones(
+            input_features.shape[:2],
+            dtype=torch.long,
+            device=self.device
+        )
+        
+        # Transcribe
+        languages = [self.default_source] * len(audio_batch)
+        with torch.no_grad():
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"Starting transcription generation for {len(audio_batch)} windows")
+            encoder_outputs = None
+            # Tracing never changes the path: an 'encode' span exists only when the encoder
+            # runs on its own here, otherwise encoding is part of the 'decode' span
+            if self.short_context:
+                with tracer.span('encode'):
+                    num_frames = context_frames(
+                        max(len(a) for a in audio_batch),
+                        self.context_granularity_frames,
+                        max_frames=input_features.shape[-1]
+                    )
+                    encoder_outputs = encode_short_context(
+                        self.whisper_model, input_features, num_frames
+                    )
+            elif self.detect_source:
+                # Encode once here so language ID and decoding share the pass
+                with tracer.span('encode'):
+                    encoder_outputs = encode(self.whisper_model, input_features)
+            
+            if self.detect_source:
+                with tracer.span('language_id'):
+                    languages = self._detect_sources(encoder_outputs, priors or [None] * len(audio_batch))
             
-            # Create attention mask
-            attention_mask = torch.ones(
-                input_features.shape[:2],
-                dtype=torch.long,
-                device=self.device
+            decode_options = dict(
+                # Per-window languages only when the batch actually mixes them
+                language=languages[0] if len(set(languages)) == 1 else languages,
+                task="transcribe",
+                max_length=self.decoding['whisper_max_length'],
+                no_repeat_ngram_size=3,
+                num_beams=self.decoding['whisper_beams']
             )
+            with tracer.span('decode'):
+                if encoder_outputs is not None:
+                    generated_ids = self.whisper_model.generate(
+                        encoder_outputs=encoder_outputs, **decode_options
+                    )
+                else:
+                    generated_ids = self.whisper_model.generate(
+                        input_features, attention_mask=attention_mask, **decode_options
+                    )
             
-            # Transcribe
-            with torch.no_grad():
-                logging.debug("Starting transcription generation")
-                generated_ids = self.whisper_model.generate(
-                    input_features,
-                    attention_mask=attention_mask,
-                    language="en",
-                    task="transcribe",
-                    max_length=448,
-                    no_repeat_ngram_size=3,
-                    num_beams=2
-                )
-                
-                transcription = self.processor.batch_decode(
-                    generated_ids, 
-                    skip_special_tokens=True
-                )[0].strip()
-                
-                if not transcription:
-                    logging.debug("No transcription generated")
-                    return None, None
-                
-                # Translate using ROMANCE model
-                translation = self._translate_text(transcription)
+        transcriptions = [
+            text.strip() for text in self.processor.batch_decode(
+                generated_ids, 
+                skip_special_tokens=True
+            )
+        ]
+        
+        elapsed = time.time() - start_time
+        self._asr_latency.observe(elapsed)
+        self._processing_seconds.inc(elapsed)
+        self._audio_seconds.inc(sum(len(a) for a in audio_batch) / self.sample_rate)
+        return transcriptions, languages
+
+    def _detect_sources(self, encoder_outputs, priors):
+        """Source language per window, skipping detection for streams whose prior is stable"""
+        languages = [None] * len(priors)
+        detect = []
+        for index, prior in enumerate(priors):
+            if prior is not None and not prior.needs_detection():
+                languages[index] = prior.skip()
+                self._language_detections_skipped.inc()
+            else:
+                detect.append(index)
+        if not detect:
+            return languages
+
+        detected = detect_languages(
+            self.whisper_model, encoder_outputs, self.language_tokens,
+            self.source_candidates, indices=detect
+        )
+        self._language_detections.inc(len(detect))
+        for index, probs in zip(detect, detected):
+            prior = priors[index]
+            languages[index] = prior.observe(probs) if prior is not None else max(probs, key=probs.get)
+        return languages
+
+    def _is_speech(self, audio_data, adapt=False):
+        """Gate audio before inference: VAD when enabled, peak level otherwise"""
+        with self.tracer.span('vad'):
+            if self.vad is not None:
+                is_speech = self.vad.contains_speech(audio_data, adapt=adapt)
+            else:
+                is_speech = np.max(np.abs(audio_data)) >= self.min_audio_level
+
+        if not is_speech:
+            self._skipped_silent.inc()
+            logging.debug("No speech detected in audio")
+        return is_speech
+
+    def process_audio_chunk(self, audio_data):
+        transcription, translations = self._process_segment(audio_data)
+        return transcription, translations.get(self.target_language)
+
+    def _process_segment(self, audio_data):
+        """Transcribe once and translate into all targets; returns (transcription, {language: translation})"""
+        try:
+            if not self._is_speech(audio_data):
+                return None, {}
+            
+            transcription, source = self._transcribe_segment(audio_data)
+            
+            if not transcription:
+                logging.debug("No transcription generated")
+                return None, {}
             
-            return transcription, translation
+            # Translate with the Marian model for the detected source language
+            translations = self._translate_all(transcription, source)
+            
+            return transcription, translations
             
         except Exception as e:
             logging.error(f"Error processing audio chunk: {str(e)}")
             logging.error(traceback.format_exc())
+            return None, {}
+
+    def process_stream_window(self, audio_data):
+        """Decode the rolling window and return (committed_text, partial_text)"""
+        try:
+            if not self._is_speech(audio_data):
+                return None, None
+
+            features = None
+            if self.frontend is not None:
+                audio_level = np.max(np.abs(audio_data))
+                features = self.frontend.window_features(audio_data, scale=1.0 / audio_level)
+                if features is None:
+                    self.frontend_fallbacks += 1
+            hypothesis, _ = self._transcribe_segment(audio_data, features)
+            committed, partial = self.agreement.insert(hypothesis)
+            return ' '.join(committed) or None, ' '.join(partial) or None
+
+        except Exception as e:
+            logging.error(f"Error processing stream window: {str(e)}")
+            logging.error(traceback.format_exc())
             return None, None
 
     def set_callback(self, callback):
         self.callback_function = callback
         logging.info("Callback function set")
+
+    def set_multi_callback(self, callback):
+        """Set a callback receiving (transcription, {language: translation}) for all targets"""
+        self.multi_callback_function = callback
+        logging.info("Multi-language callback function set")
+
+    def set_partial_callback(self, callback):
+        """Set a callback receiving unstable partial text in streaming mode"""
+        self.partial_callback_function = callback
+        logging.info("Partial callback function set")
     
-    def audio_callback(self, indata, frames, time_info, status):
-        if status:
-            logging.warning(f"Audio status: {status}")
+    def _collect_audio(self, num_samples, timeout):
+        """Wait for num_samples from the ring buffer, or take whatever arrives before timeout
+
+        Returns a view into the ring buffer; callers must not hold on to it.
+        """
+        deadline = time.time() + timeout
+        # Wait in short slices so stop_transcription is not held up
+        while self.running and not self.buffer.wait_for(num_samples, 0.1):
+            if time.time() > deadline:
+                logging.warning("Buffer collection timeout")
+                self._buffer_timeouts.inc()
+                break
         
-        try:
-            audio_data = indata.mean(axis=1) if indata.ndim > 1 else indata.flatten()
-            self.buffer.put(audio_data.copy())
-        except Exception as e:
-            logging.error(f"Error in audio callback: {str(e)}")
-    
+        audio_data = self.buffer.read(num_samples)
+        if len(audio_data) == 0:
+            return None
+        return audio_data
+
+    def _emit(self, transcription, translations):
+        primary = self.target_language
+        if primary not in translations and translations:
+            # Translated before a language switch; deliver it in the language it was made for
+            primary = next(iter(translations))
+        with self.tracer.span('emit'):
+            if self.callback_function:
+                self.callback_function(transcription, translations.get(primary))
+            if self.multi_callback_function:
+                self.multi_callback_function(transcription, translations)
+        
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        logging.info(f"English: {transcription}")
+        for language, translation in translations.items():
+            if translation:
+                lang_name = self._get_language_name(language)
+                logging.info(f"Translation ({lang_name}): {translation}")
+
+    def _current_source(self):
+        """Source language of the latest speech: the stream prior's, or the configured one"""
+        prior = self.language_prior
+        return prior.language if prior is not None and prior.language else self.default_source
+
+    def _deliver(self, transcription, source=None):
+        """Translate and emit committed text, through the MT stage when pipelined"""
+        source = source or self._current_source()
+        pipeline = self.pipeline
+        if self.incremental is not None:
+            self._step_translation(self.incremental.add(transcription, source), pipeline)
+            return
+        if pipeline is not None:
+            pipeline['mt'].put((transcription, source))
+            return
+        self._emit(transcription, self._translate_all(transcription, source))
+
+    def _flush_translation(self):
+        """Translate the unfinished sentence at an endpoint instead of waiting for more words"""
+        if self.incremental is None:
+            return
+        revision = self.incremental.flush()
+        if revision is not None:
+            self._step_translation(revision, self.pipeline)
+
+    def _step_translation(self, revision, pipeline):
+        if pipeline is not None:
+            # Revisions coalesce to the newest; the MT stage skips superseded ones
+            pipeline['mt'].put(revision)
+            return
+        result = self.incremental.step(revision)
+        if result is not None:
+            self._emit(*result)
+
+    def _handle_segment(self, audio_data):
+        """Transcribe, translate and emit a segment, or hand it to the pipeline"""
+        # One trace segment per caption; pipeline stages pick it up from the queued item
+        with self.tracer.segment():
+            pipeline = self.pipeline
+            if pipeline is not None:
+                # Copy out of the ring buffer; the segment outlives this call
+                pipeline.submit(np.array(audio_data, dtype=np.float32))
+                return
+            start_time = time.time()
+            if self.incremental is not None:
+                transcription, source = self._transcribe_segment(audio_data) if self._is_speech(audio_data) else (None, None)
+                if transcription:
+                    self._deliver(transcription, source)
+                self._observe_latency(time.time() - start_time)
+                return
+            transcription, translations = self._process_segment(audio_data)
+            self._observe_latency(time.time() - start_time)
+            if transcription:
+                self._emit(transcription, translations)
+
+    def _observe_latency(self, processing_time, queued_segments=0):
+        """Feed the adaptive scheduler and apply the profile it picks"""
+        if self.scheduler is None:
+            return
+        # depth(), not available(): in pipelined mode this runs on the ASR stage, not the consumer thread
+        backlog = self.buffer.depth() / self.sample_rate + queued_segments * processing_time
+        profile = self.scheduler.observe(processing_time, backlog)
+        if profile is not self.profile:
+            self._apply_profile(profile)
+
+    def _apply_profile(self, profile):
+        self.profile = profile
+        self._apply_decoding()
+
+    def _apply_decoding(self):
+        # Swapped as a whole so a decode in flight sees either the old or new settings
+        self.decoding = dict(self.profile, **self.decoding_overrides) if self.decoding_overrides else self.profile
+        self.buffer_duration = self.decoding['buffer_duration']
+        self.samples_per_chunk = int(self.sample_rate * self.buffer_duration)
+        if self.segmenter is not None:
+            # From the merged settings, so a chunk_duration override scales utterances too
+            scale = self.decoding['buffer_duration'] / DECODING_PROFILES[0]['buffer_duration']
+            self.segmenter.max_utterance_frames = max(1, int(round(
+                self.max_utterance_duration * scale / self.segmenter.frame_duration
+            )))
+
+    def reconfigure(self, target_language=None, target_languages=None, whisper_beams=None,
+                    mt_beams=None, chunk_duration=None, max_utterance_duration=None):
+        """Change targets and decoding settings without stopping capture or reloading models
+
+        While running, the change is queued and applied as a whole by the
+        processing thread before its next segment, so no audio is dropped and
+        every segment is decoded and translated under one configuration.
+        Settings left as None are kept. Beams and chunk_duration override the
+        adaptive scheduler's profile until set again. chunk_duration is the
+        chunk length without VAD; with VAD it scales the longest utterance
+        relative to the default 2 s chunk, as the scheduler's profiles do.
+        It has no effect in streaming mode, which decodes every hop.
+        Returns False if the translation model a new target needs could not
+        be loaded.
+        """
+        changes = {}
+        if target_language is not None or target_languages is not None:
+            primary, languages = self._resolve_targets(target_language, target_languages)
+            # Switching away from English needs Marian; load it before the switch, not during it
+            if not self._preload_translation(languages):
+                return False
+            changes['targets'] = (primary, languages)
+        if whisper_beams is not None:
+            changes['whisper_beams'] = max(1, int(whisper_beams))
+        if mt_beams is not None:
+            changes['mt_beams'] = max(1, int(mt_beams))
+        if chunk_duration is not None:
+            changes['buffer_duration'] = float(chunk_duration)
+        if max_utterance_duration is not None:
+            changes['max_utterance_duration'] = float(max_utterance_duration)
+        if not changes:
+            return True
+
+        with self._config_lock:
+            self._pending_config = dict(self._pending_config or {}, **changes)
+        if not self.running:
+            self._apply_pending_config()
+        return True
+
+    def _apply_pending_config(self):
+        """Apply queued reconfigure() changes; called by the processing thread between segments"""
+        with self._config_lock:
+            changes, self._pending_config = self._pending_config, None
+        if not changes:
+            return
+
+        if 'targets' in changes:
+            primary, languages = changes.pop('targets')
+            # The list is replaced, not mutated, so a translation in flight keeps its languages
+            self.target_languages = languages
+            self.target_language = primary
+            if self.incremental is not None:
+                self.incremental.set_languages(languages)
+            logging.info(f"Target languages set to: {languages or ['en']}")
+        if 'max_utterance_duration' in changes:
+            self.max_utterance_duration = changes.pop('max_utterance_duration')
+        if changes:
+            self.decoding_overrides = dict(self.decoding_overrides, **changes)
+        self._apply_decoding()
+        logging.info(f"Decoding settings: {self.decoding}")
+
+    def _asr_stage(self, audio_data):
+        if not self._is_speech(audio_data):
+            return None
+        start_time = time.time()
+        transcription, source = self._transcribe_segment(audio_data)
+        pipeline = self.pipeline
+        self._observe_latency(
+            time.time() - start_time,
+            pipeline['asr'].depth() if pipeline is not None else 0
+        )
+        if not transcription:
+            return None
+        if self.incremental is not None:
+            return self.incremental.add(transcription, source)
+        return transcription, source
+
+    def _mt_stage(self, item):
+        if self.incremental is not None:
+            # item is a revision number; None means it was superseded
+            return self.incremental.step(item)
+        transcription, source = item
+        return transcription, self._translate_all(transcription, source)
+
+    def _mt_batch_stage(self, items):
+        """Translate every queued (transcription, source) item in one set of batched generate calls"""
+        return [
+            (transcription, translations)
+            for (transcription, _), translations in zip(items, self._translate_batch(items))
+        ]
+
+    def _delivery_stage(self, result):
+        self._emit(*result)
+
+    def _build_pipeline(self):
+        def join_text(a, b):
+            # Only merged under backlog; a language switch inside it is translated from the newer one
+            return f"{a[0]} {b[0]}", b[1]
+
+        def join_results(a, b):
+            translations = {}
+            for language in set(a[1]) | set(b[1]):
+                parts = [t for t in (a[1].get(language), b[1].get(language)) if t]
+                translations[language] = ' '.join(parts) or None
+            return f"{a[0]} {b[0]}", translations
+
+        return Pipeline([
+            PipelineStage('asr', self._asr_stage, self.stage_queue_size,
+                          self.stage_policies['asr'],
+                          coalesce=lambda a, b: np.concatenate([a, b])),
+            self._build_mt_stage(join_text),
+            PipelineStage('delivery', self._delivery_stage, self.stage_queue_size,
+                          self.stage_policies['delivery'],
+                          coalesce=join_results),
+        ])
+
+    def _build_mt_stage(self, join_text):
+        if self.incremental is not None or self.mt_batch_size <= 1:
+            # Incremental revisions supersede each other, so only the newest is translated
+            return PipelineStage('mt', self._mt_stage, self.stage_queue_size,
+                                 self.stage_policies['mt'],
+                                 coalesce=max if self.incremental is not None else join_text)
+        # Room for a full batch to queue before the overload policy kicks in
+        return PipelineStage('mt', self._mt_batch_stage,
+                             max(self.stage_queue_size, self.mt_batch_size),
+                             self.stage_policies['mt'], coalesce=join_text,
+                             batch_size=self.mt_batch_size, batch_wait=self.mt_batch_wait)
+
+    def pipeline_stats(self):
+        return self.pipeline.stats() if self.pipeline is not None else {}
+
     def process_audio(self):
+        if self.streaming:
+            self.process_audio_streaming()
+            return
+        if self.segmenter is not None:
+            self.process_audio_utterances()
+            return
+
         logging.info("Starting audio processing loop")
         while self.running:
             try:
-                # Collect audio chunks
-                audio_chunks = []
-                current_size = 0
-                start_time = time.time()
-                
-                while current_size < self.samples_per_chunk and self.running:
-                    try:
-                        chunk = self.buffer.get(timeout=0.1)
-                        audio_chunks.append(chunk)
-                        current_size += len(chunk)
-                        
-                        if time.time() - start_time > self.buffer_duration * 1.5:
-                            logging.warning("Buffer collection timeout")
-                            break
-                            
-                    except queue.Empty:
-                        continue
+                self._apply_pending_config()
+                audio_data = self._collect_audio(
+                    self.samples_per_chunk, self.buffer_duration * 1.5
+                )
                 
                 if not self.running:
                     break
                     
-                if not audio_chunks:
+                if audio_data is None:
+                    continue
+                
+                self._handle_segment(audio_data)
+                
+            except Exception as e:
+                logging.error(f"Error in audio processing loop: {str(e)}")
+                logging.error(traceback.format_exc())
+                time.sleep(0.1)
+
+        self._flush_translation()
+
+    def process_audio_utterances(self):
+        """Transcribe VAD-endpointed utterances instead of fixed-length chunks"""
+        logging.info("Starting utterance processing loop")
+        read_samples = int(self.sample_rate * 0.1)
+        self.segmenter.reset()
+
+        while self.running:
+            try:
+                self._apply_pending_config()
+                audio_data = self._collect_audio(read_samples, 0.5)
+                
+                if not self.running:
+                    break
+                
+                if audio_data is None:
+                    continue
+                
+                for utterance in self.segmenter.push(audio_data):
+                    self._handle_segment(utterance)
+                
+            except Exception as e:
+                logging.error(f"Error in utterance processing loop: {str(e)}")
+                logging.error(traceback.format_exc())
+                time.sleep(0.1)
+
+        utterance = self.segmenter.flush()
+        if utterance is not None:
+            self._handle_segment(utterance)
+        self._flush_translation()
+
+    def process_audio_streaming(self):
+        """Decode an overlapping rolling window every hop
+
+        Only words that two consecutive decodes agree on are committed and
+        translated; the unstable tail goes to the partial callback. The window
+        is trimmed to window_overlap seconds once it exceeds
+        max_window_duration, so each hop decodes a bounded amount of audio.
+        """
+        logging.info("Starting streaming audio processing loop")
+        hop_samples = int(self.sample_rate * self.hop_duration)
+        max_window_samples = int(self.sample_rate * self.max_window_duration)
+        overlap_samples = int(self.sample_rate * self.window_overlap)
+        window = np.zeros(0, dtype=np.float32)
+        self.agreement.reset()
+        if self.frontend is not None:
+            self.frontend.reset()
+
+        while self.running:
+            try:
+                self._apply_pending_config()
+                hop = self._collect_audio(hop_samples, self.hop_duration * 1.5)
+                
+                if not self.running:
+                    break
+                
+                if hop is None:
                     continue
                 
-                audio_data = np.concatenate(audio_chunks)
-                if len(audio_data) > self.samples_per_chunk:
-                    audio_data = audio_data[:self.samples_per_chunk]
+                if self.frontend is not None:
+                    # Every hop is framed exactly once, silent or not, to keep the stream contiguous
+                    self.frontend.push(hop)
                 
-                transcription, translation = self.process_audio_chunk(audio_data)
+                if not self._is_speech(hop, adapt=True):
+                    # Pause in speech: finalize the pending hypothesis and start afresh
+                    if self.agreement.previous:
+                        forced = ' '.join(self.agreement.advance_window())
+                        if forced:
+                            self._deliver(forced)
+                        self.agreement.reset()
+                        self._flush_translation()
+                    window = window[:0]
+                    continue
+                
+                window = np.concatenate([window, hop])
+                if (self.decoding['skip_stale_partials']
+                        and self.buffer.available() >= hop_samples
+                        and len(window) < max_window_samples):
+                    # Newer audio is already waiting; decoding this hop would be stale
+                    continue
                 
-                if transcription and self.callback_function:
-                    self.callback_function(transcription, translation)
+                with self.tracer.segment():
+                    start_time = time.time()
+                    committed, partial = self.process_stream_window(window)
+                    self._observe_latency(time.time() - start_time)
                     
-                    lang_name = self._get_language_name(self.target_language)
-                    logging.info(f"English: {transcription}")
-                    if translation:
-                        logging.info(f"Translation ({lang_name}): {translation}")
+                    if committed:
+                        self._deliver(committed)
+                    
+                    if partial and self.partial_callback_function:
+                        with self.tracer.span('emit_partial'):
+                            self.partial_callback_function(partial)
+                    
+                    if len(window) >= max_window_samples:
+                        forced = ' '.join(self.agreement.advance_window())
+                        if forced:
+                            self._deliver(forced)
+                        window = window[-overlap_samples:] if overlap_samples else window[:0]
                 
             except Exception as e:
-                logging.error(f"Error in audio processing loop: {str(e)}")
+                logging.error(f"Error in streaming processing loop: {str(e)}")
                 logging.error(traceback.format_exc())
                 time.sleep(0.1)
+
+        # Flush whatever is left of the last hypothesis
+        forced = ' '.join(self.agreement.advance_window())
+        if forced:
+            self._deliver(forced)
+        self._flush_translation()
     
-    def start_transcription(self):
+    def start_transcription(self, capture=True):
+        """Start processing; with capture=False audio is written to self.buffer by someone else"""
         if self.running:
             logging.warning("Transcription already running")
             return
         
+        self._apply_pending_config()
+        self._init_incremental()
+        if self.language_prior is not None:
+            # A new session may be a different speaker
+            self.language_prior.reset()
         self.running = True
         logging.info("Starting transcription")
         
         try:
-            self.stream = sd.InputStream(
-                callback=self.audio_callback,
-                channels=1,
-                samplerate=self.sample_rate,
-                blocksize=int(self.sample_rate * 0.1)
-            )
-            self.stream.start()
-            logging.info("Audio stream started")
+            if capture:
+                if self.source is None:
+                    self.source = DeviceSource()
+                self.source.start(self.buffer)
+                self.stream = self.source
+            
+            if self.pipelined:
+                self.pipeline = self._build_pipeline()
+                self.pipeline.start()
+                logging.info("Pipeline stages started")
             
             self.processing_thread = threading.Thread(target=self.process_audio)
             self.processing_thread.start()
@@ -302,6 +1224,9 @@ class ContinuousTranscriber:
             
         except Exception as e:
             self.running = False
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                self.pipeline = None
             logging.error(f"Error starting transcription: {str(e)}")
             logging.error(traceback.format_exc())
             raise
@@ -313,9 +1238,13 @@ class ContinuousTranscriber:
         try:
             if self.stream:
                 self.stream.stop()
-                self.stream.close()
                 self.stream = None
-                logging.info("Audio stream stopped")
+            
+            # Stop stages first so a producer blocked on a full queue is released
+            if self.pipeline is not None:
+                logging.info(f"Pipeline stats: {self.pipeline.stats()}")
+                self.pipeline.stop()
+                self.pipeline = None
             
             if self.processing_thread:
                 self.processing_thread.join(timeout=2.0)
@@ -323,11 +1252,12 @@ class ContinuousTranscriber:
                     logging.warning("Processing thread did not stop cleanly")
                 self.processing_thread = None
             
-            while not self.buffer.empty():
-                try:
-                    self.buffer.get_nowait()
-                except queue.Empty:
-                    break
+            if self.buffer.dropped_samples:
+                logging.warning(
+                    f"Dropped {self.buffer.dropped_samples} samples in "
+                    f"{self.buffer.overflow_count} buffer overflows"
+                )
+            self.buffer.clear()
             
             logging.info("Transcription stopped successfully")
             
@@ -0,0 +1,187 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+
+class _ModelEntry:
+    def __init__(self, value, load_time, size_bytes):
+        self.value = value
+        self.load_time = load_time
+        self.size_bytes = size_bytes
+        self.ref_count = 0
+        self.hits = 0
+        self.last_used = time.time()
+
+
+class _PendingLoad:
+    """A load in progress; callers wanting the same key wait on done"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+def estimate_model_size(value):
+    """Estimate resident size in bytes of a model (or tuple of models)"""
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_model_size(item) for item in value)
+
+    size = 0
+    try:
+        for param in value.parameters():
+            size += param.numel() * param.element_size()
+        for buf in value.buffers():
+            size += buf.numel() * buf.element_size()
+    except AttributeError:
+        # Processors and tokenizers have no tensors worth counting
+        return 0
+    return size
+
+
+class ModelManager:
+    """Process-wide cache of loaded models with LRU eviction of idle entries
+
+    Loads run outside the manager lock, so a slow load only holds up
+    callers of the same key; they wait for it instead of loading twice.
+    """
+
+    def __init__(self, memory_budget_mb=None):
+        self.memory_budget_mb = memory_budget_mb
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def acquire(self, key, loader):
+        """Return the model for key, loading it with loader() on first use"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.ref_count += 1
+                    entry.hits += 1
+                    entry.last_used = time.time()
+                    logging.debug(f"Reusing loaded model: {key}")
+                    return entry.value
+
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = _PendingLoad()
+                    break
+
+            # Another thread is loading this key
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+
+        logging.info(f"Loading model into manager: {key}")
+        start_time = time.time()
+        try:
+            value = loader()
+        except BaseException as e:
+            # Also on KeyboardInterrupt, so waiters are never left hanging
+            pending.error = e
+            with self._lock:
+                del self._loading[key]
+            pending.done.set()
+            raise
+        load_time = time.time() - start_time
+        size_bytes = estimate_model_size(value)
+
+        entry = _ModelEntry(value, load_time, size_bytes)
+        entry.ref_count = 1
+        with self._lock:
+            self._entries[key] = entry
+            del self._loading[key]
+            self._enforce_budget()
+        pending.done.set()
+        logging.info(
+            f"Loaded {key} in {load_time:.2f}s "
+            f"({size_bytes / (1024 * 1024):.1f} MB)"
+        )
+        return value
+
+    def release(self, key):
+        """Drop one reference to key; idle models stay cached until evicted"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.ref_count = max(0, entry.ref_count - 1)
+            entry.last_used = time.time()
+            self._enforce_budget()
+
+    def set_memory_budget(self, memory_budget_mb):
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            self._enforce_budget()
+
+    def total_size(self):
+        with self._lock:
+            return sum(entry.size_bytes for entry in self._entries.values())
+
+    def _enforce_budget(self):
+        if self.memory_budget_mb is None:
+            return
+
+        budget_bytes = self.memory_budget_mb * 1024 * 1024
+        total = self.total_size()
+        if total <= budget_bytes:
+            return
+
+        # Oldest entries first; models still referenced are never evicted
+        for key in list(self._entries.keys()):
+            if total <= budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry.ref_count > 0:
+                continue
+            del self._entries[key]
+            total -= entry.size_bytes
+            logging.info(
+                f"Evicted idle model {key} "
+                f"({entry.size_bytes / (1024 * 1024):.1f} MB)"
+            )
+
+        if total > budget_bytes:
+            logging.warning(
+                f"Models in use exceed memory budget: "
+                f"{total / (1024 * 1024):.1f} MB > {self.memory_budget_mb} MB"
+            )
+
+    def evict_idle(self):
+        """Unload every model that currently has no references"""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.ref_count == 0]:
+                del self._entries[key]
+                logging.info(f"Evicted idle model {key}")
+
+    def stats(self):
+        """Return load time, size and usage for every resident model"""
+        with self._lock:
+            return {
+                key: {
+                    'load_time': entry.load_time,
+                    'size_mb': entry.size_bytes / (1024 * 1024),
+                    'ref_count': entry.ref_count,
+                    'hits': entry.hits,
+                    'last_used': entry.last_used,
+                }
+                for key, entry in self._entries.items()
+            }
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_model_manager(memory_budget_mb=None):
+    """Return the shared ModelManager, creating it on first call"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = ModelManager(memory_budget_mb=memory_budget_mb)
+        elif memory_budget_mb is not None:
+            _default_manager.set_memory_budget(memory_budget_mb)
+        return _default_manager
@@ -0,0 +1,257 @@
+import threading
+import time
+import logging
+import traceback
+from collections import deque
+import numpy as np
+from ring_buffer import AudioRingBuffer
+from vad import UtteranceSegmenter
+
+
+class _StreamState:
+    def __init__(self, name, sample_rate, callback, buffer_capacity_duration, max_utterance_duration,
+                 language_prior=None):
+        self.name = name
+        self.callback = callback
+        # Source-language belief for this speaker; None when the language is fixed
+        self.language_prior = language_prior
+        self.buffer = AudioRingBuffer(int(sample_rate * buffer_capacity_duration))
+        self.segmenter = UtteranceSegmenter(
+            sample_rate=sample_rate,
+            max_utterance_duration=max_utterance_duration
+        )
+        self.ready = deque()
+        self.input_stream = None
+        # Set by remove_stream(); the worker drains the stream before dropping it
+        self.closing = False
+
+        self.segments_processed = 0
+        self.audio_seconds = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def stats(self):
+        processed = self.segments_processed
+        stats = {
+            'pending_segments': len(self.ready),
+            'segments_processed': processed,
+            'audio_seconds': self.audio_seconds,
+            'mean_latency': self.total_latency / processed if processed else 0.0,
+            'max_latency': self.max_latency,
+            'dropped_samples': self.buffer.dropped_samples,
+        }
+        if self.language_prior is not None:
+            stats['source_language'] = self.language_prior.stats()
+        return stats
+
+
+class MultiStreamEngine:
+    """Transcribe many named audio streams with one shared model
+
+    Every stream gets its own ring buffer and VAD segmenter. A single worker
+    collects finished utterances from all streams and runs them through
+    Whisper in micro-batches of up to max_batch_size. Streams are served
+    round-robin, one segment per stream per pass, so a busy stream cannot
+    starve a quiet one. Results go to the callback registered for the stream
+    as callback(transcription, translation).
+    """
+
+    def __init__(self, transcriber, max_batch_size=8, batch_wait=0.05,
+                 buffer_capacity_duration=30.0, max_utterance_duration=5.0):
+        # The transcriber is only used for its loaded models and helpers
+        self.transcriber = transcriber
+        self.sample_rate = transcriber.sample_rate
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait
+        self.buffer_capacity_duration = buffer_capacity_duration
+        self.max_utterance_duration = max_utterance_duration
+
+        self.streams = {}
+        self._streams_lock = threading.Lock()
+        self._cursor = 0
+        self.running = False
+        self.worker_thread = None
+
+        self.batches_run = 0
+        self.batch_sizes = deque(maxlen=1000)
+
+    def add_stream(self, name, callback):
+        """Register a stream fed by feed(); returns nothing"""
+        with self._streams_lock:
+            if name in self.streams:
+                raise ValueError(f"Stream '{name}' already exists")
+            self.streams[name] = _StreamState(
+                name, self.sample_rate, callback,
+                self.buffer_capacity_duration, self.max_utterance_duration,
+                self.transcriber.new_language_prior()
+            )
+        logging.info(f"Added stream: {name}")
+
+    def add_device_stream(self, name, callback, device=None):
+        """Register a stream captured from a local input device (mic, loopback)"""
+        import sounddevice as sd
+
+        self.add_stream(name, callback)
+        state = self.streams[name]
+
+        def audio_callback(indata, frames, time_info, status):
+            if status:
+                logging.warning(f"Audio status on {name}: {status}")
+            state.buffer.write(indata[:, 0] if indata.ndim > 1 else indata)
+
+        state.input_stream = sd.InputStream(
+            callback=audio_callback,
+            device=device,
+            channels=1,
+            samplerate=self.sample_rate,
+            blocksize=int(self.sample_rate * 0.1)
+        )
+        if self.running:
+            state.input_stream.start()
+
+    def remove_stream(self, name):
+        """Stop a stream; audio it already delivered is still transcribed before it is dropped"""
+        with self._streams_lock:
+            state = self.streams.get(name)
+            if state is None:
+                return
+            state.closing = True
+            if not self.running:
+                # No worker to drain it
+                self.streams.pop(name, None)
+        if state.input_stream:
+            state.input_stream.stop()
+            state.input_stream.close()
+        logging.info(f"Closing stream: {name}")
+
+    def feed(self, name, samples):
+        """Push mono float32 samples at the engine sample rate into a stream"""
+        self.streams[name].buffer.write(samples)
+
+    def start(self):
+        if self.running:
+            logging.warning("Multi-stream engine already running")
+            return
+        self.running = True
+        for state in list(self.streams.values()):
+            if state.input_stream:
+                state.input_stream.start()
+        self.worker_thread = threading.Thread(target=self._run, daemon=True)
+        self.worker_thread.start()
+        logging.info("Multi-stream engine started")
+
+    def stop(self):
+        self.running = False
+        for state in list(self.streams.values()):
+            if state.input_stream:
+                state.input_stream.stop()
+        if self.worker_thread:
+            self.worker_thread.join(timeout=2.0)
+            if self.worker_thread.is_alive():
+                logging.warning("Multi-stream worker did not stop cleanly")
+            self.worker_thread = None
+        logging.info("Multi-stream engine stopped")
+
+    def _collect(self):
+        """Move newly captured audio from every stream through its segmenter"""
+        now = time.time()
+        for state in list(self.streams.values()):
+            available = state.buffer.available()
+            if available:
+                for utterance in state.segmenter.push(state.buffer.read(available)):
+                    state.ready.append((utterance, now))
+            if state.closing:
+                # No more audio is coming; the utterance in progress is the last one
+                utterance = state.segmenter.flush()
+                if utterance is not None:
+                    state.ready.append((utterance, now))
+
+    def _drop_drained(self):
+        """Forget closing streams once everything they delivered has been processed"""
+        with self._streams_lock:
+            for name, state in list(self.streams.items()):
+                if state.closing and not state.ready and not state.buffer.available():
+                    del self.streams[name]
+                    logging.info(f"Removed stream: {name}")
+
+    def _next_batch(self):
+        """Pick up to max_batch_size segments, round-robin across streams"""
+        states = [s for s in self.streams.values() if s.ready]
+        if not states:
+            return []
+
+        pending = sum(len(s.ready) for s in states)
+        oldest = min(s.ready[0][1] for s in states)
+        closing = any(s.closing for s in states)
+        if not closing and pending < self.max_batch_size and time.time() - oldest < self.batch_wait:
+            # Give other streams a moment to fill the batch
+            return []
+
+        batch = []
+        self._cursor = (self._cursor + 1) % len(states)
+        ordered = states[self._cursor:] + states[:self._cursor]
+        while len(batch) < self.max_batch_size and any(s.ready for s in ordered):
+            for state in ordered:
+                if state.ready and len(batch) < self.max_batch_size:
+                    utterance, ready_time = state.ready.popleft()
+                    batch.append((state, utterance, ready_time))
+        return batch
+
+    def _run(self):
+        while self.running:
+            try:
+                self._collect()
+                batch = self._next_batch()
+                if batch:
+                    self._process_batch(batch)
+                self._drop_drained()
+                if not batch:
+                    time.sleep(0.01)
+            except Exception as e:
+                logging.error(f"Error in multi-stream loop: {str(e)}")
+                logging.error(traceback.format_exc())
+                time.sleep(0.1)
+
+    def _process_batch(self, batch):
+        # Segments decoded together share one trace segment
+        with self.transcriber.tracer.segment():
+            self._decode_and_deliver(batch)
+
+    def _decode_and_deliver(self, batch):
+        transcriptions, sources = self.transcriber._decode_batch(
+            [utterance for _, utterance, _ in batch],
+            priors=[state.language_prior for state, _, _ in batch]
+        )
+        self.batches_run += 1
+        self.batch_sizes.append(len(batch))
+
+        # Every stream's transcription goes through Marian together, bucketed by length
+        transcriber = self.transcriber
+        translations = [None] * len(batch)
+        if transcriber.target_language in transcriber.target_languages:
+            translations = transcriber._translate_many([
+                (transcription, transcriber.target_language, source)
+                for transcription, source in zip(transcriptions, sources)
+            ])
+
+        for (state, utterance, ready_time), transcription, translation in zip(batch, transcriptions, translations):
+            latency = time.time() - ready_time
+            state.segments_processed += 1
+            state.audio_seconds += len(utterance) / self.sample_rate
+            state.total_latency += latency
+            state.max_latency = max(state.max_latency, latency)
+
+            if not transcription:
+                continue
+            try:
+                state.callback(transcription, translation)
+            except Exception as e:
+                logging.error(f"Error in callback for stream {state.name}: {str(e)}")
+
+    def stats(self):
+        sizes = list(self.batch_sizes)
+        return {
+            'batches_run': self.batches_run,
+            'mean_batch_size': float(np.mean(sizes)) if sizes else 0.0,
+            'streams': {name: state.stats() for name, state in list(self.streams.items())},
+        }
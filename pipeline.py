@@ -0,0 +1,245 @@
+import threading
+import time
+import logging
+import traceback
+from collections import deque
+from tracing import get_tracer
+
+
+class PipelineStage:
+    """A worker thread fed by a bounded queue with an overload policy
+
+    When the queue is full, put() applies the stage policy:
+      block        wait for space (backpressure onto the producer)
+      drop_oldest  discard the oldest queued item
+      drop_newest  discard the incoming item
+      coalesce     merge the incoming item into the newest queued one
+    The handler's non-None return value is forwarded to the downstream stage.
+
+    With batch_size > 1 the handler instead takes a list of up to batch_size
+    queued items and returns one result per item, forwarded in order. While
+    the stage is backlogged it waits up to batch_wait seconds for a batch to
+    fill; an item arriving at an idle stage is handled on its own right away.
+    Items carry the trace segment of the thread that queued them, so spans
+    recorded by the handler (and the time spent queued) join that segment.
+    """
+
+    POLICIES = ('block', 'drop_oldest', 'drop_newest', 'coalesce')
+
+    def __init__(self, name, handler, maxsize=4, policy='block', coalesce=None,
+                 batch_size=1, batch_wait=0.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown stage policy '{policy}' for stage {name}")
+        if policy == 'coalesce' and coalesce is None:
+            raise ValueError(f"Stage {name} uses 'coalesce' but has no coalesce function")
+
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce = coalesce
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.downstream = None
+        self.tracer = get_tracer()
+        self._queue_span = f"queue:{name}"
+
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self.running = False
+
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.max_depth = 0
+        self.batches = 0
+        self.last_batch = 0
+
+    def put(self, item, timeout=None):
+        """Queue an item; returns False if it was dropped"""
+        segment = self.tracer.current_segment()
+        entry = (item, segment, time.perf_counter_ns() if segment else 0)
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'block':
+                    deadline = None if timeout is None else time.time() + timeout
+                    while len(self._items) >= self.maxsize and self.running:
+                        remaining = None if deadline is None else deadline - time.time()
+                        if remaining is not None and remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._condition.wait(remaining)
+                    if not self.running:
+                        # Stopped while waiting for space
+                        self.dropped += 1
+                        return False
+                elif self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                else:
+                    # The merged item stays in the trace segment of the one already queued
+                    queued, queued_segment, enqueued = self._items[-1]
+                    self._items[-1] = (self.coalesce(queued, item), queued_segment, enqueued)
+                    self.coalesced += 1
+                    return True
+
+            self._items.append(entry)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._condition.notify_all()
+            return True
+
+    def depth(self):
+        with self._condition:
+            return len(self._items)
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the worker; items still queued are discarded and counted in dropped"""
+        with self._condition:
+            self.running = False
+            discarded = len(self._items)
+            self._items.clear()
+            self.dropped += discarded
+            self._condition.notify_all()
+        if discarded:
+            logging.warning(f"Stage {self.name} stopped with {discarded} queued items discarded")
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logging.warning(f"Stage {self.name} did not stop cleanly")
+            self._thread = None
+
+    def _take_batch(self):
+        """Pop up to batch_size items; call with the condition held and at least one item queued"""
+        # Only a stage that is behind waits for more; a lone item at an idle stage goes straight through
+        if self.batch_wait > 0 and (len(self._items) > 1 or self.last_batch > 1):
+            deadline = time.time() + self.batch_wait
+            while len(self._items) < self.batch_size and self.running:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+        count = min(self.batch_size, len(self._items))
+        return [self._items.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._items and self.running:
+                    self._condition.wait(0.1)
+                if not self.running:
+                    return
+                if self.batch_size > 1:
+                    entries = self._take_batch()
+                else:
+                    entries = [self._items.popleft()]
+                self.batches += 1
+                self.last_batch = len(entries)
+                # Wake producers blocked on a full queue
+                self._condition.notify_all()
+
+            if self.batch_size > 1:
+                self._process_batch(entries)
+                continue
+
+            item, segment, enqueued = entries[0]
+            with self.tracer.use_segment(segment):
+                if segment:
+                    self.tracer.record(self._queue_span, enqueued)
+                start_time = time.time()
+                try:
+                    result = self.handler(item)
+                except Exception as e:
+                    self.errors += 1
+                    logging.error(f"Error in pipeline stage {self.name}: {str(e)}")
+                    logging.error(traceback.format_exc())
+                    continue
+                finally:
+                    self.busy_time += time.time() - start_time
+                self.processed += 1
+
+                if result is not None and self.downstream is not None:
+                    self.downstream.put(result)
+
+    def _process_batch(self, entries):
+        segments = [segment for _, segment, _ in entries if segment]
+        for _, segment, enqueued in entries:
+            if segment:
+                with self.tracer.use_segment(segment):
+                    self.tracer.record(self._queue_span, enqueued)
+
+        # Spans recorded by the handler go to the first traced segment of the batch
+        with self.tracer.use_segment(segments[0] if segments else 0):
+            start_time = time.time()
+            try:
+                results = self.handler([item for item, _, _ in entries])
+            except Exception as e:
+                self.errors += len(entries)
+                logging.error(f"Error in pipeline stage {self.name}: {str(e)}")
+                logging.error(traceback.format_exc())
+                return
+            finally:
+                self.busy_time += time.time() - start_time
+        self.processed += len(entries)
+
+        if self.downstream is None:
+            return
+        for (_, segment, _), result in zip(entries, results):
+            if result is not None:
+                # Downstream stages see each result in its own segment again
+                with self.tracer.use_segment(segment):
+                    self.downstream.put(result)
+
+    def stats(self):
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'busy_time': self.busy_time,
+            'policy': self.policy,
+            'batches': self.batches,
+            'mean_batch_size': self.processed / self.batches if self.batches else 0.0,
+        }
+
+
+class Pipeline:
+    """A chain of PipelineStages, each feeding the next"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for upstream, downstream in zip(self.stages, self.stages[1:]):
+            upstream.downstream = downstream
+
+    def __getitem__(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def submit(self, item, timeout=None):
+        return self.stages[0].put(item, timeout=timeout)
+
+    def start(self):
+        # Start consumers first so nothing is queued to a stopped stage
+        for stage in reversed(self.stages):
+            stage.start()
+
+    def stop(self, timeout=2.0):
+        for stage in self.stages:
+            stage.stop(timeout=timeout)
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,281 @@
+import os
+import time
+import logging
+import threading
+import traceback
+import multiprocessing
+
+from ring_buffer import SharedAudioRing
+from audio_source import DeviceSource
+
+
+def _worker_main(ring_name, capacity, conn, control, active, shutdown, options, config):
+    """Inference process: reads audio from the shared ring and sends results back over conn
+
+    reconfigure() settings arrive over control and are applied by the
+    transcriber between segments.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - [asr-worker] %(message)s'
+    )
+    ring = SharedAudioRing(capacity, name=ring_name)
+    send_lock = threading.Lock()
+
+    def send(message):
+        # Results come from the processing thread and pipeline stages alike
+        with send_lock:
+            conn.send(message)
+
+    from model import ContinuousTranscriber
+
+    transcriber = ContinuousTranscriber(audio_buffer=ring, **options)
+    transcriber.set_multi_callback(lambda transcription, translations: send(('result', transcription, translations)))
+    transcriber.set_partial_callback(lambda partial: send(('partial', partial)))
+    if config:
+        # Settings changed live before a restart
+        transcriber.reconfigure(**config)
+    transcriber.warm_up()
+    target_language = transcriber.target_language
+    send(('ready', os.getpid(), target_language))
+
+    def poll_control():
+        nonlocal target_language
+        while control.poll():
+            transcriber.reconfigure(**control.recv())
+        # Reported once the switch has been applied, which is between segments
+        if transcriber.target_language != target_language:
+            target_language = transcriber.target_language
+            send(('config', target_language))
+
+    last_stats = time.time()
+    while not shutdown.is_set():
+        poll_control()
+        if not active.wait(0.1):
+            continue
+        transcriber.start_transcription(capture=False)
+        while active.is_set() and not shutdown.is_set():
+            time.sleep(0.1)
+            poll_control()
+            if time.time() - last_stats >= 5.0:
+                send(('stats', transcriber.metrics_snapshot()))
+                last_stats = time.time()
+        transcriber.stop_transcription()
+
+    transcriber.close()
+    ring.close()
+    conn.close()
+
+
+class ProcessTranscriber:
+    """ContinuousTranscriber with Whisper and Marian in a supervised worker process
+
+    Capture stays in this process: the PortAudio callback only copies
+    samples into a SharedAudioRing, so it never waits on the GIL of a
+    process running generate(). The worker reads the ring, runs the normal
+    ContinuousTranscriber loops and sends results back over a pipe; a
+    receiver thread here invokes the callbacks.
+
+    A supervisor thread restarts the worker if it dies. Capture is not
+    interrupted, and since the read position lives in shared memory the new
+    worker picks up the audio that arrived while it was loading, as long as
+    the restart takes less than buffer_capacity_duration. Only the segment
+    the dead worker was decoding is lost.
+    """
+
+    def __init__(self, target_language='en', buffer_capacity_duration=60.0,
+                 max_restarts=5, restart_backoff=1.0, ready_timeout=300.0,
+                 audio_source=None, **options):
+        self.sample_rate = 16000
+        self.options = dict(options, target_language=target_language)
+        self.target_language = target_language
+        self.config = {}
+        self._control = None
+        self._control_lock = threading.Lock()
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.ready_timeout = ready_timeout
+
+        self.buffer = SharedAudioRing(int(self.sample_rate * buffer_capacity_duration))
+        self._context = multiprocessing.get_context('spawn')
+        self._active = self._context.Event()
+        self._shutdown = self._context.Event()
+        self._ready = threading.Event()
+
+        self.callback_function = None
+        self.multi_callback_function = None
+        self.partial_callback_function = None
+        self.running = False
+        self.source = audio_source or DeviceSource()
+        self.process = None
+        self.worker_pid = None
+        self.worker_stats = {}
+        self.restarts = 0
+        self._closed = False
+
+        self._spawn_worker()
+        self._supervisor = threading.Thread(target=self._supervise, name='asr-supervisor', daemon=True)
+        self._supervisor.start()
+
+    def _spawn_worker(self):
+        receiver, sender = self._context.Pipe(duplex=False)
+        control_receiver, control_sender = self._context.Pipe(duplex=False)
+        self._ready.clear()
+        with self._control_lock:
+            self.process = self._context.Process(
+                target=_worker_main,
+                args=(self.buffer.name, self.buffer.capacity, sender, control_receiver,
+                      self._active, self._shutdown, self.options, dict(self.config)),
+                name='asr-worker',
+                daemon=True
+            )
+            self.process.start()
+            self._control = control_sender
+        # Only the worker holds the sending end, so its death closes the pipe
+        sender.close()
+        control_receiver.close()
+        threading.Thread(
+            target=self._receive, args=(receiver,), name='asr-results', daemon=True
+        ).start()
+        logging.info(f"Started ASR worker process {self.process.pid}")
+
+    def _receive(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                kind = message[0]
+                if kind == 'result':
+                    self._emit(message[1], message[2])
+                elif kind == 'partial':
+                    if self.partial_callback_function:
+                        self.partial_callback_function(message[1])
+                elif kind == 'stats':
+                    self.worker_stats = message[1]
+                elif kind == 'config':
+                    self.target_language = message[1]
+                elif kind == 'ready':
+                    self.worker_pid = message[1]
+                    self.target_language = message[2]
+                    self._ready.set()
+                    logging.info(f"ASR worker {self.worker_pid} ready")
+            except Exception as e:
+                logging.error(f"Error handling worker message: {str(e)}")
+                logging.error(traceback.format_exc())
+
+    def _supervise(self):
+        failures = 0
+        while not self._closed:
+            process = self.process
+            process.join(0.5)
+            if self._closed or process.is_alive():
+                continue
+            if self._shutdown.is_set():
+                return
+
+            failures = failures + 1 if not self._ready.is_set() else 1
+            logging.error(
+                f"ASR worker {process.pid} exited with code {process.exitcode}; "
+                f"{self.buffer.depth() / self.sample_rate:.1f}s of audio waiting"
+            )
+            if self.restarts >= self.max_restarts:
+                logging.error("ASR worker restart limit reached, giving up")
+                return
+            # Back off when the worker keeps dying before it is even ready
+            time.sleep(min(self.restart_backoff * 2 ** (failures - 1), 30.0))
+            if self._closed:
+                return
+            self.restarts += 1
+            self._spawn_worker()
+
+    def _emit(self, transcription, translations):
+        primary = self.target_language
+        if primary not in translations and translations:
+            # Translated before a language switch; deliver it in the language it was made for
+            primary = next(iter(translations))
+        if self.callback_function:
+            self.callback_function(transcription, translations.get(primary))
+        if self.multi_callback_function:
+            self.multi_callback_function(transcription, translations)
+
+    def set_callback(self, callback):
+        self.callback_function = callback
+
+    def set_multi_callback(self, callback):
+        self.multi_callback_function = callback
+
+    def set_partial_callback(self, callback):
+        self.partial_callback_function = callback
+
+    def warm_up(self, timeout=None):
+        """Wait until the worker has loaded and warmed up its models"""
+        ready = self._ready.wait(self.ready_timeout if timeout is None else timeout)
+        if not ready:
+            logging.warning("ASR worker not ready yet")
+        return ready
+
+    def reconfigure(self, **changes):
+        """Forward to the worker's ContinuousTranscriber.reconfigure without stopping capture
+
+        The settings are also kept for any worker started after a crash.
+        """
+        changes = {key: value for key, value in changes.items() if value is not None}
+        if 'target_language' in changes or 'target_languages' in changes:
+            # A new target replaces the previous one rather than combining with it
+            self.config.pop('target_language', None)
+            self.config.pop('target_languages', None)
+        self.config.update(changes)
+        with self._control_lock:
+            try:
+                self._control.send(changes)
+            except (BrokenPipeError, OSError) as e:
+                logging.warning(f"ASR worker unavailable, settings apply on restart: {str(e)}")
+        return True
+
+    def start_transcription(self):
+        if self.running:
+            logging.warning("Transcription already running")
+            return
+        self.running = True
+        self.source.start(self.buffer)
+        # Audio is buffered even if the worker is still loading
+        self._active.set()
+        logging.info("Capture started, inference in worker process")
+
+    def stop_transcription(self):
+        self.running = False
+        self._active.clear()
+        try:
+            self.source.stop()
+        except Exception as e:
+            logging.error(f"Error stopping transcription: {str(e)}")
+
+    def close(self, timeout=5.0):
+        """Stop capture, shut the worker down and free the shared ring"""
+        if self._closed:
+            return
+        self.stop_transcription()
+        self._closed = True
+        self._shutdown.set()
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                logging.warning("ASR worker did not exit, terminating")
+                self.process.terminate()
+                self.process.join(1.0)
+        self._supervisor.join(timeout=1.0)
+        self.buffer.close()
+
+    def metrics_snapshot(self):
+        """Capture-side stats plus the worker's most recent metrics snapshot"""
+        return {
+            'worker_pid': self.worker_pid,
+            'worker_alive': self.process is not None and self.process.is_alive(),
+            'restarts': self.restarts,
+            'samples_captured': self.buffer.total_written,
+            'buffer_depth_samples': self.buffer.depth(),
+            'samples_dropped_total': self.buffer.dropped_samples,
+            'worker': self.worker_stats,
+        }
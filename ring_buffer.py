@@ -0,0 +1,223 @@
+import threading
+import time
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Fixed-capacity single-producer/single-consumer float32 sample buffer
+
+    The producer (the PortAudio callback) only ever advances the write
+    position and the consumer only ever advances the read position, so
+    neither side takes a lock. Storage is mirrored: every sample is written
+    at index i and i + capacity, which lets the consumer get any window of up
+    to capacity samples as a contiguous zero-copy view, even across the wrap.
+
+    Overflow policy is drop-oldest. The producer never waits; if the consumer
+    falls more than capacity samples behind, the next consumer call skips
+    ahead to the oldest sample still in storage and counts what was lost in
+    dropped_samples. Views returned by peek()/read() alias the storage and
+    stay valid until the producer has written another capacity samples.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._buffer = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._write_pos = 0
+        self._read_pos = 0
+        self._data_ready = threading.Event()
+
+        self.dropped_samples = 0
+        self.overflow_count = 0
+
+    @property
+    def total_written(self):
+        """Samples written since creation, including any later dropped"""
+        return self._write_pos
+
+    @property
+    def total_read(self):
+        """Samples consumed or skipped since creation"""
+        return self._read_pos
+
+    # Producer side
+
+    def write(self, samples):
+        """Append samples; never blocks and never allocates"""
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            # Only the newest capacity samples can be kept
+            self._write_pos += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        capacity = self.capacity
+        start = self._write_pos % capacity
+        first = min(n, capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        self._buffer[start + capacity:start + capacity + first] = samples[:first]
+
+        rest = n - first
+        if rest:
+            self._buffer[:rest] = samples[first:]
+            self._buffer[capacity:capacity + rest] = samples[first:]
+
+        # Publish only after the samples are in place
+        self._write_pos += n
+        self._data_ready.set()
+
+    def free_space(self):
+        """Samples that can be written before unread audio would be overwritten"""
+        return max(0, self.capacity - (self._write_pos - self._read_pos))
+
+    def depth(self):
+        """Unread samples without applying the overflow policy; safe from any thread"""
+        return min(self._write_pos - self._read_pos, self.capacity)
+
+    # Consumer side
+
+    def available(self):
+        """Number of unread samples, after applying the overflow policy"""
+        behind = self._write_pos - self._read_pos
+        if behind > self.capacity:
+            lost = behind - self.capacity
+            self._read_pos += lost
+            self.dropped_samples += lost
+            self.overflow_count += 1
+            behind = self.capacity
+        return behind
+
+    def peek(self, num_samples, offset=0):
+        """Return a zero-copy view of unread samples without consuming them"""
+        num_samples = min(num_samples, self.available() - offset)
+        if num_samples <= 0:
+            return self._buffer[:0]
+        start = (self._read_pos + offset) % self.capacity
+        return self._buffer[start:start + num_samples]
+
+    def advance(self, num_samples):
+        """Consume num_samples (or everything available if fewer)"""
+        self._read_pos += max(0, min(num_samples, self.available()))
+
+    def read(self, num_samples):
+        """Return a view of up to num_samples unread samples and consume them"""
+        view = self.peek(num_samples)
+        self._read_pos += len(view)
+        return view
+
+    def wait_for(self, num_samples, timeout=None):
+        """Block until num_samples are available; return False on timeout"""
+        num_samples = min(num_samples, self.capacity)
+        deadline = None if timeout is None else time.time() + timeout
+        while self.available() < num_samples:
+            self._data_ready.clear()
+            # Re-check after clearing so a write in between is not missed
+            if self.available() >= num_samples:
+                break
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._data_ready.wait(remaining)
+        return True
+
+    def read_until(self, num_samples, timeout=None):
+        """Block until num_samples arrive, then return them as a view
+
+        On timeout whatever is available is returned (possibly empty).
+        """
+        self.wait_for(num_samples, timeout)
+        return self.read(num_samples)
+
+    def clear(self):
+        """Discard all unread samples (consumer side)"""
+        self._read_pos = self._write_pos
+
+
+class SharedAudioRing(AudioRingBuffer):
+    """AudioRingBuffer whose storage and positions live in shared memory
+
+    Lets a capture process and an inference process share one ring: the
+    creator (name=None) allocates and later unlinks the segment, other
+    processes attach by name. Positions and overflow counters are kept in
+    an int64 header, so a consumer process that dies and is restarted
+    resumes at the last read position. Aligned 8-byte stores are atomic on
+    the platforms we run on, and the producer publishes its position only
+    after the samples are written, so the SPSC protocol is unchanged.
+    Waiting cannot use a threading.Event across processes, so consumers
+    poll every poll_interval seconds.
+    """
+
+    HEADER = 4  # write_pos, read_pos, dropped_samples, overflow_count
+
+    def __init__(self, capacity, name=None, poll_interval=0.005):
+        from multiprocessing import shared_memory
+
+        self.capacity = int(capacity)
+        self.poll_interval = poll_interval
+        self.owner = name is None
+        size = self.HEADER * 8 + 2 * self.capacity * 4
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+
+        self._header = np.ndarray((self.HEADER,), dtype=np.int64, buffer=self._shm.buf)
+        self._buffer = np.ndarray(
+            (2 * self.capacity,), dtype=np.float32, buffer=self._shm.buf, offset=self.HEADER * 8
+        )
+        if self.owner:
+            self._header[:] = 0
+        # Only wakes waiters in this process; cross-process waiters poll
+        self._data_ready = threading.Event()
+
+    @property
+    def _write_pos(self):
+        return int(self._header[0])
+
+    @_write_pos.setter
+    def _write_pos(self, value):
+        self._header[0] = value
+
+    @property
+    def _read_pos(self):
+        return int(self._header[1])
+
+    @_read_pos.setter
+    def _read_pos(self, value):
+        self._header[1] = value
+
+    @property
+    def dropped_samples(self):
+        return int(self._header[2])
+
+    @dropped_samples.setter
+    def dropped_samples(self, value):
+        self._header[2] = value
+
+    @property
+    def overflow_count(self):
+        return int(self._header[3])
+
+    @overflow_count.setter
+    def overflow_count(self, value):
+        self._header[3] = value
+
+    def wait_for(self, num_samples, timeout=None):
+        """Block until num_samples are available; return False on timeout"""
+        num_samples = min(num_samples, self.capacity)
+        deadline = None if timeout is None else time.time() + timeout
+        while self.available() < num_samples:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def close(self):
+        """Detach from the segment; the creator also unlinks it"""
+        self._header = None
+        self._buffer = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
@@ -0,0 +1,108 @@
+import time
+import logging
+
+
+# Ordered from best quality to cheapest; level 0 matches the original hard-coded settings
+DECODING_PROFILES = [
+    {'name': 'full', 'whisper_beams': 2, 'whisper_max_length': 448,
+     'mt_beams': 4, 'mt_max_length': 512, 'buffer_duration': 2.0,
+     'skip_stale_partials': False},
+    {'name': 'greedy_asr', 'whisper_beams': 1, 'whisper_max_length': 448,
+     'mt_beams': 2, 'mt_max_length': 512, 'buffer_duration': 2.0,
+     'skip_stale_partials': False},
+    {'name': 'greedy', 'whisper_beams': 1, 'whisper_max_length': 224,
+     'mt_beams': 1, 'mt_max_length': 256, 'buffer_duration': 3.0,
+     'skip_stale_partials': True},
+    {'name': 'catch_up', 'whisper_beams': 1, 'whisper_max_length': 224,
+     'mt_beams': 1, 'mt_max_length': 256, 'buffer_duration': 5.0,
+     'skip_stale_partials': True},
+]
+
+
+class AdaptiveScheduler:
+    """Pick a decoding profile from measured latency and backlog
+
+    Each observation estimates caption latency as the time the last segment
+    took to process plus the audio still waiting in front of the model. The
+    estimate is smoothed, and the scheduler steps one profile cheaper after
+    `patience` consecutive observations above degrade_ratio * target, or one
+    profile better after `patience` observations below restore_ratio * target.
+    A cooldown after each switch keeps it from oscillating.
+    """
+
+    def __init__(self, latency_target, profiles=None, degrade_ratio=1.0, restore_ratio=0.5,
+                 patience=2, cooldown=3.0, smoothing=0.5, on_switch=None):
+        self.latency_target = latency_target
+        self.profiles = profiles or DECODING_PROFILES
+        self.degrade_ratio = degrade_ratio
+        self.restore_ratio = restore_ratio
+        self.patience = patience
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.on_switch = on_switch
+
+        self.level = 0
+        self.estimate = 0.0
+        self.switches = 0
+        self.degrades = 0
+        self.restores = 0
+        self._over = 0
+        self._under = 0
+        self._last_switch = 0.0
+
+    @property
+    def profile(self):
+        return self.profiles[self.level]
+
+    def observe(self, processing_time, backlog_seconds):
+        """Record one processed segment; returns the profile to use next"""
+        sample = processing_time + backlog_seconds
+        if self.estimate:
+            self.estimate = self.smoothing * sample + (1 - self.smoothing) * self.estimate
+        else:
+            self.estimate = sample
+
+        if self.estimate > self.latency_target * self.degrade_ratio:
+            self._over += 1
+            self._under = 0
+        elif self.estimate < self.latency_target * self.restore_ratio:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = 0
+            self._under = 0
+
+        if time.time() - self._last_switch < self.cooldown:
+            return self.profile
+
+        if self._over >= self.patience and self.level < len(self.profiles) - 1:
+            self._switch(self.level + 1)
+            self.degrades += 1
+        elif self._under >= self.patience and self.level > 0:
+            self._switch(self.level - 1)
+            self.restores += 1
+        return self.profile
+
+    def _switch(self, level):
+        previous = self.profile['name']
+        self.level = level
+        self.switches += 1
+        self._over = 0
+        self._under = 0
+        self._last_switch = time.time()
+        logging.info(
+            f"Decoding mode {previous} -> {self.profile['name']} "
+            f"(estimated latency {self.estimate:.2f}s, target {self.latency_target:.2f}s)"
+        )
+        if self.on_switch:
+            self.on_switch(previous, self.profile['name'])
+
+    def stats(self):
+        return {
+            'mode': self.profile['name'],
+            'level': self.level,
+            'estimated_latency': self.estimate,
+            'switches': self.switches,
+            'degrades': self.degrades,
+            'restores': self.restores,
+        }
@@ -0,0 +1,45 @@
+import math
+import torch
+
+
+def context_frames(num_samples, granularity_frames, hop_length=160, max_frames=3000):
+    """Mel frames to keep for num_samples of audio, rounded up to the granularity"""
+    # The encoder's second convolution has stride 2, so keep an even frame count
+    granularity_frames = max(2, granularity_frames + granularity_frames % 2)
+    frames = math.ceil(num_samples / hop_length)
+    frames = math.ceil(frames / granularity_frames) * granularity_frames
+    return min(max(frames, granularity_frames), max_frames)
+
+
+def supports_short_context(whisper_model):
+    """True for a PyTorch WhisperEncoder; exported (ONNX) encoders have a fixed input length"""
+    get_encoder = getattr(whisper_model, 'get_encoder', None)
+    if get_encoder is None:
+        return False
+    encoder = get_encoder()
+    return hasattr(encoder, 'conv1') and hasattr(encoder, 'embed_positions')
+
+
+def encode_short_context(whisper_model, input_features, num_frames):
+    """Run the Whisper encoder over only the first num_frames mel frames
+
+    Mirrors WhisperEncoder.forward, but slices the positional embeddings to
+    the shorter sequence instead of insisting on 3000 input frames. The
+    result can be passed to generate() as encoder_outputs; the decoder's
+    cross-attention works with any encoder length.
+    """
+    from transformers.modeling_outputs import BaseModelOutput
+
+    encoder = whisper_model.get_encoder()
+    features = input_features[:, :, :num_frames]
+
+    hidden_states = torch.nn.functional.gelu(encoder.conv1(features))
+    hidden_states = torch.nn.functional.gelu(encoder.conv2(hidden_states))
+    hidden_states = hidden_states.permute(0, 2, 1)
+    hidden_states = hidden_states + encoder.embed_positions.weight[:hidden_states.shape[1]]
+
+    for layer in encoder.layers:
+        hidden_states = layer(hidden_states, None, layer_head_mask=None)[0]
+
+    hidden_states = encoder.layer_norm(hidden_states)
+    return BaseModelOutput(last_hidden_state=hidden_states)
@@ -0,0 +1,78 @@
+import re
+from collections import deque
+
+
+def split_words(text):
+    return text.split() if text else []
+
+
+def _normalize_word(word):
+    return re.sub(r"[^\w']", '', word.lower())
+
+
+class LocalAgreement:
+    """Commit the prefix that consecutive hypotheses of a rolling window agree on
+
+    Each call to insert() takes the full hypothesis for the current window.
+    Words are committed once two consecutive decodes agree on them; the
+    remaining tail is reported as an unstable partial result.
+    """
+
+    def __init__(self, max_dedup_words=5):
+        self.max_dedup_words = max_dedup_words
+        # Only the tail is needed to strip overlap after a window trim
+        self.committed = deque(maxlen=max_dedup_words)
+        self.previous = []
+        self.committed_in_window = 0
+        self._dedup_tail = []
+
+    def insert(self, text):
+        """Add a new window hypothesis; return (newly_committed, partial) word lists"""
+        words = self._strip_committed_overlap(split_words(text))
+
+        agreed = 0
+        for old, new in zip(self.previous, words):
+            if _normalize_word(old) != _normalize_word(new):
+                break
+            agreed += 1
+
+        newly_committed = []
+        if agreed > self.committed_in_window:
+            newly_committed = words[self.committed_in_window:agreed]
+            self.committed_in_window = agreed
+            self.committed.extend(newly_committed)
+
+        self.previous = words
+        partial = words[self.committed_in_window:]
+        return newly_committed, partial
+
+    def advance_window(self):
+        """Force-commit the last hypothesis before the window is trimmed
+
+        The audio kept after trimming overlaps words that are already
+        committed, so the next hypothesis has its leading duplicates removed.
+        """
+        forced = self.previous[self.committed_in_window:]
+        self.committed.extend(forced)
+        self._dedup_tail = list(self.committed)
+        self.previous = []
+        self.committed_in_window = 0
+        return forced
+
+    def reset(self):
+        self.committed.clear()
+        self.previous = []
+        self.committed_in_window = 0
+        self._dedup_tail = []
+
+    def _strip_committed_overlap(self, words):
+        if not self._dedup_tail or not words:
+            return words
+
+        tail = [_normalize_word(w) for w in self._dedup_tail]
+        head = [_normalize_word(w) for w in words]
+        # Longest n-gram where the committed tail equals the hypothesis head
+        for n in range(min(len(tail), len(head)), 0, -1):
+            if tail[-n:] == head[:n]:
+                return words[n:]
+        return words
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import itertools
+import threading
+import numpy as np
+
+
+class _NullSpan:
+    """Returned by span() when nothing is recorded; entering and leaving it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name_id', 'segment', 'start')
+
+    def __init__(self, tracer, name_id, segment):
+        self.tracer = tracer
+        self.name_id = name_id
+        self.segment = segment
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._write(self.name_id, self.start, time.perf_counter_ns(), self.segment)
+        return False
+
+
+class _SegmentScope:
+    __slots__ = ('tracer', 'segment', 'previous')
+
+    def __init__(self, tracer, segment):
+        self.tracer = tracer
+        self.segment = segment
+
+    def __enter__(self):
+        local = self.tracer._local
+        self.previous = getattr(local, 'segment', 0)
+        local.segment = self.segment
+        return self.segment
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._local.segment = self.previous
+        return False
+
+
+class Tracer:
+    """Record timed spans into a preallocated ring for Chrome trace export
+
+    Work for one caption is grouped under a segment id: segment() opens a
+    new one on the current thread, and span(name) records into it. Only
+    one segment in every 1/sample_rate is traced; for the rest, and
+    whenever the tracer is disabled, span() returns a shared no-op context,
+    so instrumented code costs an attribute check and a call. Spans are
+    written into fixed numpy arrays, with no allocation or locking per
+    span, and the oldest are overwritten once capacity is reached.
+
+    export_chrome() writes trace-event JSON for chrome://tracing or
+    Perfetto, one row per thread, with the segment id on every span.
+    """
+
+    def __init__(self, capacity=65536, sample_rate=1.0, enabled=False):
+        self.capacity = capacity
+        self._name_ids = {}
+        self.names = []
+        self._names_lock = threading.Lock()
+        self._thread_names = {}
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+
+        self._name = np.zeros(capacity, dtype=np.int32)
+        self._start = np.zeros(capacity, dtype=np.int64)
+        self._end = np.zeros(capacity, dtype=np.int64)
+        self._thread = np.zeros(capacity, dtype=np.uint64)
+        self._segment = np.zeros(capacity, dtype=np.int64)
+        self._cursor = itertools.count()
+        self._segments = itertools.count(1)
+        self._unscoped = itertools.count()
+        self.recorded = 0
+
+        self.enabled = False
+        self.sample_every = 1
+        if enabled:
+            self.enable(sample_rate)
+
+    def enable(self, sample_rate=1.0):
+        """Start recording one in every 1/sample_rate segments"""
+        self.sample_every = max(1, int(round(1.0 / sample_rate))) if sample_rate > 0 else 0
+        self.enabled = self.sample_every > 0
+
+    def disable(self):
+        self.enabled = False
+
+    def _name_id(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            with self._names_lock:
+                name_id = self._name_ids.get(name)
+                if name_id is None:
+                    name_id = len(self.names)
+                    self.names.append(name)
+                    self._name_ids[name] = name_id
+        return name_id
+
+    def _write(self, name_id, start, end, segment):
+        index = next(self._cursor)
+        slot = index % self.capacity
+        thread = threading.get_ident()
+        if thread not in self._thread_names:
+            self._thread_names[thread] = threading.current_thread().name
+        self._name[slot] = name_id
+        self._start[slot] = start
+        self._end[slot] = end
+        self._thread[slot] = thread
+        self._segment[slot] = segment
+        self.recorded = max(self.recorded, index + 1)
+
+    def segment(self):
+        """Open a new segment on this thread; use as a context manager, yields its id (0 if unsampled)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        number = next(self._segments)
+        return _SegmentScope(self, number if number % self.sample_every == 0 else 0)
+
+    def current_segment(self):
+        return getattr(self._local, 'segment', 0) if self.enabled else 0
+
+    def use_segment(self, segment):
+        """Continue a segment opened elsewhere, e.g. on the thread that queued the work"""
+        return _SegmentScope(self, segment) if segment else _NULL_SPAN
+
+    def span(self, name):
+        """Time the with-block as part of the current segment"""
+        if not self.enabled:
+            return _NULL_SPAN
+        segment = getattr(self._local, 'segment', 0)
+        if not segment:
+            return _NULL_SPAN
+        return _Span(self, self._name_id(name), segment)
+
+    def record(self, name, start, end=None):
+        """Record an already timed span in the current segment; times from perf_counter_ns()"""
+        segment = self.current_segment()
+        if segment:
+            self._write(self._name_id(name), start, end or time.perf_counter_ns(), segment)
+
+    def record_unscoped(self, name, start, end=None):
+        """Record a span outside any segment, e.g. an audio callback, sampled per call"""
+        if not self.enabled or next(self._unscoped) % self.sample_every:
+            return
+        self._write(self._name_id(name), start, end or time.perf_counter_ns(), -1)
+
+    def _valid(self):
+        count = min(self.recorded, self.capacity)
+        if self.recorded <= self.capacity:
+            return np.arange(count)
+        # Oldest first once the ring has wrapped
+        return (np.arange(count) + self.recorded) % self.capacity
+
+    def spans(self):
+        """Recorded spans oldest first as dicts with times in microseconds since the tracer started"""
+        slots = self._valid()
+        names = self.names
+        result = []
+        for slot in slots[np.argsort(self._start[slots], kind='stable')]:
+            result.append({
+                'name': names[self._name[slot]],
+                'start_us': (int(self._start[slot]) - self._origin) / 1000.0,
+                'duration_us': (int(self._end[slot]) - int(self._start[slot])) / 1000.0,
+                'thread': int(self._thread[slot]),
+                'segment': int(self._segment[slot]),
+            })
+        return result
+
+    def segments(self):
+        """Per-segment timelines: {segment: {'spans': {name: ms}, 'start_ms', 'total_ms'}}"""
+        timelines = {}
+        for span in self.spans():
+            if span['segment'] <= 0:
+                continue
+            timeline = timelines.setdefault(span['segment'], {
+                'spans': {}, 'start_ms': span['start_us'] / 1000.0, 'end_ms': 0.0
+            })
+            duration = span['duration_us'] / 1000.0
+            timeline['spans'][span['name']] = timeline['spans'].get(span['name'], 0.0) + duration
+            timeline['end_ms'] = max(timeline['end_ms'], span['start_us'] / 1000.0 + duration)
+        for timeline in timelines.values():
+            timeline['total_ms'] = timeline.pop('end_ms') - timeline['start_ms']
+        return timelines
+
+    def slowest(self, count=10):
+        """The count segments with the longest first-to-last span time, slowest first"""
+        timelines = self.segments()
+        ordered = sorted(timelines, key=lambda s: timelines[s]['total_ms'], reverse=True)
+        return [dict(timelines[s], segment=s) for s in ordered[:count]]
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread, 'args': {'name': name}}
+            for thread, name in list(self._thread_names.items())
+        ]
+        for span in self.spans():
+            events.append({
+                'name': span['name'],
+                'cat': 'segment' if span['segment'] > 0 else 'capture',
+                'ph': 'X',
+                'ts': span['start_us'],
+                'dur': span['duration_us'],
+                'pid': pid,
+                'tid': span['thread'],
+                'args': {'segment': span['segment']},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome(self, path):
+        """Write the recorded spans as Chrome trace-event JSON; returns the number of spans"""
+        trace = self.chrome_trace()
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+        return sum(1 for event in trace['traceEvents'] if event['ph'] == 'X')
+
+    def clear(self):
+        self._cursor = itertools.count()
+        self.recorded = 0
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'sample_every': self.sample_every,
+            'recorded': self.recorded,
+            'capacity': self.capacity,
+            'overwritten': max(0, self.recorded - self.capacity),
+        }
+
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Return the shared Tracer, creating it on first call
+
+    Set CAPTION_TRACE to a sample rate (e.g. 1 or 0.1) to enable it at startup.
+    """
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            sample_rate = float(os.environ.get('CAPTION_TRACE', 0) or 0)
+            capacity = int(os.environ.get('CAPTION_TRACE_CAPACITY', 65536))
+            _default_tracer = Tracer(capacity, sample_rate, enabled=sample_rate > 0)
+        return _default_tracer
@@ -0,0 +1,240 @@
+import re
+import atexit
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+
+# Short phrases that come up in almost every call
+COMMON_PHRASES = [
+    "Yes.",
+    "No.",
+    "Okay.",
+    "Thank you.",
+    "Thank you very much.",
+    "Can you hear me?",
+    "I can hear you.",
+    "Can you see my screen?",
+    "Hello everyone.",
+    "Good morning.",
+    "Good afternoon.",
+    "Let's get started.",
+    "Any questions?",
+    "Sorry, you're on mute.",
+    "Could you repeat that?",
+    "See you next time.",
+    "Bye.",
+]
+
+
+def normalize_text(text):
+    """Cache key form of a source segment: single spaces, no edge whitespace
+
+    Case and punctuation stay in the key; "You're coming?" and "You're
+    coming." need different translations.
+    """
+    return re.sub(r'\s+', ' ', text.strip())
+
+
+class TranslationCache:
+    """Two-tier translation cache: in-memory LRU in front of a bounded SQLite store
+
+    Entries are keyed on (normalized source text, target language, model id).
+    The SQLite tier keeps at most max_db_entries rows and evicts the least
+    recently used ones when it grows past that.
+
+    Writes stay off the translation path: new entries and last-used updates
+    are queued and written in one transaction once flush_size of them are
+    waiting or flush_interval seconds have passed, and on flush()/close().
+    """
+
+    def __init__(self, db_path='translation_cache.db', memory_size=1024, max_db_entries=100000,
+                 flush_size=64, flush_interval=10.0):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_db_entries = max_db_entries
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts_since_evict = 0
+        # Rows not yet in SQLite: key -> (translation, last_used), and key -> last_used
+        self._pending_puts = {}
+        self._pending_touches = {}
+        self._last_flush = time.time()
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source, target, model)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, text, target_language, model_id):
+        """Return the cached translation or None"""
+        key = (normalize_text(text), target_language, model_id)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            pending = self._pending_puts.get(key)
+            if pending is not None:
+                # Fell out of memory before it was written
+                self.memory_hits += 1
+                self._remember(key, pending[0])
+                return pending[0]
+
+            row = self._conn.execute(
+                "SELECT translation FROM translations WHERE source = ? AND target = ? AND model = ?",
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.db_hits += 1
+            self._pending_touches[key] = time.time()
+            self._remember(key, row[0])
+            self._maybe_flush()
+            return row[0]
+
+    def put(self, text, target_language, model_id, translation):
+        key = (normalize_text(text), target_language, model_id)
+        with self._lock:
+            self._remember(key, translation)
+            self._pending_puts[key] = (translation, time.time())
+            self._pending_touches.pop(key, None)
+            self._maybe_flush()
+
+    def flush(self):
+        """Write queued entries and last-used updates to SQLite"""
+        with self._lock:
+            self._flush()
+
+    def _maybe_flush(self):
+        pending = len(self._pending_puts) + len(self._pending_touches)
+        if pending >= self.flush_size or (pending and time.time() - self._last_flush >= self.flush_interval):
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.time()
+        if not self._pending_puts and not self._pending_touches:
+            return
+        puts, self._pending_puts = self._pending_puts, {}
+        touches, self._pending_touches = self._pending_touches, {}
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (source, target, model, translation, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [key + value for key, value in puts.items()]
+            )
+            self._conn.executemany(
+                "UPDATE translations SET last_used = ? WHERE source = ? AND target = ? AND model = ?",
+                [(last_used,) + key for key, last_used in touches.items()]
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error writing translation cache: {str(e)}")
+            return
+
+        self._inserts_since_evict += len(puts)
+        if self._inserts_since_evict >= 100:
+            self._evict_db()
+
+    def contains(self, text, target_language, model_id):
+        """True if a translation is cached; does not count as a lookup"""
+        key = (normalize_text(text), target_language, model_id)
+        with self._lock:
+            if key in self._memory or key in self._pending_puts:
+                return True
+            return self._conn.execute(
+                "SELECT 1 FROM translations WHERE source = ? AND target = ? AND model = ?",
+                key
+            ).fetchone() is not None
+
+    def prewarm(self, phrases, translate_fn, target_language, model_id):
+        """Translate and store any phrases not yet cached; returns the number added
+
+        translate_fn takes a list of phrases and returns their translations,
+        and should not write to the cache itself.
+        """
+        missing = [phrase for phrase in phrases if not self.contains(phrase, target_language, model_id)]
+        added = 0
+        if missing:
+            for phrase, translation in zip(missing, translate_fn(missing)):
+                if translation:
+                    self.put(phrase, target_language, model_id, translation)
+                    added += 1
+        logging.info(f"Prewarmed translation cache with {added} phrases for {target_language}")
+        return added
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_db(self):
+        self._inserts_since_evict = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.max_db_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM translations WHERE rowid IN "
+            "(SELECT rowid FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        logging.info(f"Evicted {excess} entries from translation cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            db_entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            pending_writes = len(self._pending_puts) + len(self._pending_touches)
+        return {
+            'memory_hits': self.memory_hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'db_entries': db_entries,
+            'pending_writes': pending_writes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_translation_cache(db_path='translation_cache.db'):
+    """Return the shared TranslationCache for db_path, creating it on first call"""
+    with _caches_lock:
+        if db_path not in _caches:
+            _caches[db_path] = TranslationCache(db_path=db_path)
+            # Queued writes would otherwise be lost when the process exits
+            atexit.register(_caches[db_path].flush)
+        return _caches[db_path]
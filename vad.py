@@ -0,0 +1,226 @@
+import numpy as np
+import logging
+from collections import deque
+
+
+class VoiceActivityDetector:
+    """Frame-level speech detector using energy, spectral flatness and zero-crossing rate
+
+    All features are computed with NumPy over a (frames, samples) view of the
+    input, so a block of audio costs a handful of vectorized operations. The
+    energy threshold follows an adaptive noise floor: it drops immediately to
+    quieter blocks and rises slowly, so steady background noise is learned
+    while speech pauses keep it anchored.
+    """
+
+    def __init__(self, sample_rate=16000, frame_duration=0.03, snr_threshold_db=9.0,
+                 min_energy_db=-55.0, initial_noise_db=-60.0, noise_adapt_rate=0.01,
+                 max_flatness=0.6, max_zero_crossing_rate=0.45, hangover_duration=0.15):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_duration)
+        self.snr_threshold_db = snr_threshold_db
+        self.min_energy_db = min_energy_db
+        self.noise_floor_db = initial_noise_db
+        self.noise_adapt_rate = noise_adapt_rate
+        self.max_flatness = max_flatness
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.hangover_frames = max(0, int(round(hangover_duration / frame_duration)))
+        self._window = np.hanning(self.frame_length).astype(np.float32)
+        self._hangover_tail = np.zeros(self.hangover_frames, dtype=bool)
+
+    def frame(self, audio):
+        """Return a zero-copy (frames, frame_length) view of audio; trailing samples are ignored"""
+        num_frames = len(audio) // self.frame_length
+        return audio[:num_frames * self.frame_length].reshape(num_frames, self.frame_length)
+
+    def frame_features(self, frames):
+        """Return per-frame energy (dB), spectral flatness and zero-crossing rate"""
+        energy = np.mean(frames * frames, axis=1)
+        energy_db = 10.0 * np.log10(energy + 1e-12)
+
+        spectrum = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(spectrum), axis=1)) / np.mean(spectrum, axis=1)
+
+        signs = np.signbit(frames)
+        zero_crossing_rate = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        return energy_db, flatness, zero_crossing_rate
+
+    def speech_mask(self, frames, adapt=True):
+        """Classify frames as speech, with hangover carried across calls when adapt is set"""
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+
+        energy_db, flatness, zero_crossing_rate = self.frame_features(frames)
+        threshold = max(self.noise_floor_db + self.snr_threshold_db, self.min_energy_db)
+        raw = (
+            (energy_db > threshold)
+            & (flatness < self.max_flatness)
+            & (zero_crossing_rate < self.max_zero_crossing_rate)
+        )
+
+        if adapt:
+            block_floor = float(np.percentile(energy_db, 10))
+            if block_floor < self.noise_floor_db:
+                self.noise_floor_db = block_floor
+            else:
+                self.noise_floor_db += self.noise_adapt_rate * (block_floor - self.noise_floor_db)
+
+        if not self.hangover_frames:
+            return raw
+
+        # A frame counts as speech if any of the preceding hangover frames did
+        extended = np.concatenate([self._hangover_tail, raw])
+        counts = np.convolve(extended.astype(np.int32),
+                             np.ones(self.hangover_frames + 1, dtype=np.int32))
+        mask = counts[self.hangover_frames:self.hangover_frames + len(raw)] > 0
+        if adapt:
+            self._hangover_tail = extended[-self.hangover_frames:]
+        return mask
+
+    def contains_speech(self, audio, min_speech_ratio=0.1, adapt=False):
+        """Return True if enough of the audio is classified as speech"""
+        frames = self.frame(audio)
+        if len(frames) == 0:
+            return False
+        mask = self.speech_mask(frames, adapt=adapt)
+        return np.mean(mask) >= min_speech_ratio
+
+    def calibrate(self, audio, percentile=10):
+        """Set the noise floor from the quieter frames of a recording, for offline use
+
+        Live audio adapts the floor gradually; a whole file can be measured
+        up front so its first utterances are already judged against it.
+        """
+        frames = self.frame(audio)
+        if len(frames) == 0:
+            return self.noise_floor_db
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+        self.noise_floor_db = float(np.percentile(energy_db, percentile))
+        return self.noise_floor_db
+
+    def reset(self, initial_noise_db=-60.0):
+        self.noise_floor_db = initial_noise_db
+        self._hangover_tail = np.zeros(self.hangover_frames, dtype=bool)
+
+
+class UtteranceSegmenter:
+    """Split a live audio stream into utterances at natural pauses
+
+    push() accepts arbitrarily sized blocks and returns the utterances that
+    were completed by them, optionally with their start and end times in
+    seconds from the first sample pushed. An utterance ends after min_silence_duration of
+    non-speech or when it reaches max_utterance_duration. Utterances with less
+    than min_speech_duration of speech (clicks, taps) are discarded.
+    """
+
+    def __init__(self, vad=None, sample_rate=16000, min_silence_duration=0.4,
+                 min_speech_duration=0.25, max_utterance_duration=5.0, pre_roll_duration=0.2):
+        self.vad = vad or VoiceActivityDetector(sample_rate=sample_rate)
+        frame_duration = self.vad.frame_length / sample_rate
+        self.frame_duration = frame_duration
+        self.min_silence_frames = max(1, int(round(min_silence_duration / frame_duration)))
+        self.min_speech_frames = max(1, int(round(min_speech_duration / frame_duration)))
+        self.max_utterance_frames = max(1, int(round(max_utterance_duration / frame_duration)))
+        self._pre_roll = deque(maxlen=max(0, int(round(pre_roll_duration / frame_duration))))
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._current = []
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self._in_speech = False
+        self._start_frame = 0
+        self._position = 0
+
+        self.frames_total = 0
+        self.frames_speech = 0
+        self.utterances_emitted = 0
+        self.utterances_rejected = 0
+
+    def push(self, audio, return_times=False):
+        """Feed audio and return completed utterances
+
+        Each item is an array, or (start_seconds, end_seconds, array) when
+        return_times is set.
+        """
+        # Always copy: frames kept for the utterance must not alias the caller's buffer
+        audio = np.concatenate([self._remainder, np.asarray(audio, dtype=np.float32)])
+        frames = self.vad.frame(audio)
+        self._remainder = audio[len(frames) * self.vad.frame_length:].copy()
+        if len(frames) == 0:
+            return []
+
+        mask = self.vad.speech_mask(frames)
+        self.frames_total += len(frames)
+        self.frames_speech += int(np.count_nonzero(mask))
+
+        utterances = []
+        for frame, is_speech in zip(frames, mask):
+            self._position += 1
+            if not self._in_speech:
+                if is_speech:
+                    self._in_speech = True
+                    self._start_frame = self._position - 1 - len(self._pre_roll)
+                    self._current = list(self._pre_roll) + [frame]
+                    self._pre_roll.clear()
+                    self._speech_frames = 1
+                    self._silence_frames = 0
+                else:
+                    self._pre_roll.append(frame)
+                continue
+
+            self._current.append(frame)
+            if is_speech:
+                self._speech_frames += 1
+                self._silence_frames = 0
+            else:
+                self._silence_frames += 1
+
+            if (self._silence_frames >= self.min_silence_frames
+                    or len(self._current) >= self.max_utterance_frames):
+                utterance = self._finish(return_times)
+                if utterance is not None:
+                    utterances.append(utterance)
+
+        return utterances
+
+    def flush(self, return_times=False):
+        """Return the utterance in progress, if any, and reset"""
+        if not self._in_speech:
+            return None
+        return self._finish(return_times)
+
+    def reset(self):
+        self._pre_roll.clear()
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._current = []
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self._start_frame = 0
+        self._position = 0
+
+    def speech_ratio(self):
+        return self.frames_speech / self.frames_total if self.frames_total else 0.0
+
+    def _finish(self, return_times=False):
+        # Drop trailing silence beyond a short tail so the model sees mostly speech
+        keep = len(self._current) - max(0, self._silence_frames - self._pre_roll.maxlen)
+        frames = self._current[:max(1, keep)]
+        speech_frames = self._speech_frames
+
+        self._current = []
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_frames = 0
+
+        if speech_frames < self.min_speech_frames:
+            self.utterances_rejected += 1
+            logging.debug(f"Discarded {speech_frames} speech frames as noise")
+            return None
+
+        self.utterances_emitted += 1
+        utterance = np.concatenate(frames)
+        if return_times:
+            start = self._start_frame * self.frame_duration
+            return start, start + len(frames) * self.frame_duration, utterance
+        return utterance
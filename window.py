@@ -1,44 +1,127 @@
+import os
 import sys
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QLabel, QVBoxLayout, QWidget,
+    QApplication, QMainWindow, QVBoxLayout, QWidget,
     QPushButton, QComboBox, QHBoxLayout
 )
 from PyQt5.QtCore import Qt, QObject, pyqtSignal
 from PyQt5.QtGui import QColor, QPalette
 import logging
-from model import ContinuousTranscriber
+import queue
+import threading
+import time
+from caption_view import RollingCaptionView
 
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.environ.get('CAPTION_LOG_LEVEL', 'INFO'),
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 class TranslationThread(QObject):
+    """Owns the transcriber and does all heavy work on one background worker
+
+    torch/transformers are imported, models loaded and warmed up off the GUI
+    thread. Tasks run in the order they were requested, so a Start pressed
+    during warm-up simply begins once the models are ready.
+    """
+
     translation_received = pyqtSignal(str)
+    status_changed = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
         self.transcriber = None
+        self.language = None
+        self._tasks = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='translation-worker', daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            task, args = self._tasks.get()
+            if task is None:
+                return
+            try:
+                task(*args)
+            except Exception as e:
+                logger.error(f"Error in translation worker: {e}", exc_info=True)
+
+    def handle_translation(self, transcription, translation):
+        # English target has no translation; show the transcription instead
+        caption = translation or transcription
+        if caption:
+            self.translation_received.emit(caption)
+
+    def warm_up(self, target_language):
+        """Load and warm up the models in the background as soon as the app starts"""
+        self._tasks.put((self._prepare, (target_language, True)))
+
+    def _prepare(self, target_language, report_ready=False):
+        if self.transcriber and self.language == target_language:
+            return
+
+        start_time = time.time()
+        if self.transcriber is None:
+            self.status_changed.emit('Loading speech libraries...')
+        if os.environ.get('TRANSCRIBER_OUT_OF_PROCESS') == '1':
+            # Inference in a worker process; this process never imports torch
+            from process_transcriber import ProcessTranscriber as Transcriber
+        else:
+            # Deferred so the window can show before torch and transformers are imported
+            from model import ContinuousTranscriber as Transcriber
+
+        if self.transcriber:
+            # Releases model references; the shared manager keeps them loaded
+            self.transcriber.close()
+            self.transcriber = None
 
-    def handle_translation(self, translation):
-        self.translation_received.emit(
-            translation or 'Waiting for speech...'
+        self.status_changed.emit('Loading models...')
+        self.transcriber = Transcriber(
+            target_language=target_language,
+            # 'auto' detects the spoken language per utterance
+            source_language=os.environ.get('TRANSCRIBER_SOURCE_LANGUAGE', 'en')
         )
+        self.transcriber.set_callback(self.handle_translation)
+        self.language = target_language
+
+        self.status_changed.emit('Warming up...')
+        self.transcriber.warm_up()
+        logger.info(f"Transcriber for {target_language} ready in {time.time() - start_time:.2f}s")
+        if report_ready:
+            self.status_changed.emit('Ready')
+
+    def change_language(self, target_language):
+        self._tasks.put((self._change_language, (target_language,)))
+
+    def _change_language(self, target_language):
+        """Switch the target in place; capture and the loaded models are kept"""
+        if self.transcriber is None:
+            self._prepare(target_language, True)
+            return
+        if self.transcriber.reconfigure(target_language=target_language):
+            self.language = target_language
+            logger.info(f"Target language changed to: {target_language}")
+        else:
+            self.status_changed.emit('Could not change language')
 
     def start_translation(self, target_language):
-        try:
-            if self.transcriber:
-                self.transcriber.stop_transcription()
+        self._tasks.put((self._start, (target_language,)))
 
-            self.transcriber = ContinuousTranscriber(target_language=target_language)
-            self.transcriber.set_callback(lambda _, translation: self.handle_translation(translation))
+    def _start(self, target_language):
+        try:
+            self._prepare(target_language)
+            self.status_changed.emit('Waiting for speech...')
             self.transcriber.start_transcription()
             logger.info(f"Started translation with target language: {target_language}")
         except Exception as e:
             logger.error(f"Error starting translation: {e}", exc_info=True)
+            self.status_changed.emit('Could not start translation')
 
     def stop_translation(self):
+        self._tasks.put((self._stop, ()))
+
+    def _stop(self):
         try:
             if self.transcriber:
                 self.transcriber.stop_transcription()
@@ -46,6 +129,24 @@ class TranslationThread(QObject):
         except Exception as e:
             logger.error(f"Error stopping translation: {e}", exc_info=True)
 
+    def _close(self):
+        """Release the transcriber; for the out-of-process one this ends the worker and frees shared memory"""
+        try:
+            if self.transcriber:
+                self.transcriber.close()
+                self.transcriber = None
+        except Exception as e:
+            logger.error(f"Error closing transcriber: {e}", exc_info=True)
+
+    def shutdown(self, timeout=10.0):
+        """Stop transcription, close the transcriber and the worker; waits up to timeout"""
+        self._tasks.put((self._stop, ()))
+        self._tasks.put((self._close, ()))
+        self._tasks.put((None, ()))
+        self._worker.join(timeout=timeout)
+        if self._worker.is_alive():
+            logger.warning("Translation worker did not finish shutting down")
+
 class TranslationWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -105,11 +206,13 @@ class TranslationWindow(QMainWindow):
         layout.setContentsMargins(20, 20, 20, 20)
 
         # Translation display
-        self.translation_label = QLabel('Waiting for speech...')
-        self.translation_label.setWordWrap(True)
-        self.translation_label.setAlignment(Qt.AlignCenter)
-        self.translation_label.setStyleSheet("""
-            QLabel {
+        self.translation_view = RollingCaptionView(
+            max_lines=100,
+            max_fps=float(os.environ.get('CAPTION_MAX_FPS', 10)),
+            placeholder='Waiting for speech...'
+        )
+        self.translation_view.setStyleSheet("""
+            QPlainTextEdit {
                 background-color: #1A1A1A;
                 color: white;
                 border-radius: 10px;
@@ -117,7 +220,7 @@ class TranslationWindow(QMainWindow):
                 font-size: 16px;
             }
         """)
-        self.translation_label.setMinimumHeight(100)
+        self.translation_view.setMinimumHeight(100)
 
         # Controls container
         controls_widget = QWidget()
@@ -141,7 +244,7 @@ class TranslationWindow(QMainWindow):
         controls_layout.addStretch()
 
         # Add widgets to main layout
-        layout.addWidget(self.translation_label)
+        layout.addWidget(self.translation_view)
         layout.addWidget(controls_widget)
 
         # Window properties
@@ -154,6 +257,9 @@ class TranslationWindow(QMainWindow):
     def setupTranslation(self):
         self.translation_thread = TranslationThread()
         self.translation_thread.translation_received.connect(self.update_label)
+        self.translation_thread.status_changed.connect(self.update_status)
+        # Models load while the user picks a language
+        self.translation_thread.warm_up(self.language_combo.currentText().lower())
 
     def toggle_translation(self, checked):
         if checked:
@@ -165,19 +271,23 @@ class TranslationWindow(QMainWindow):
             self.translation_thread.stop_translation()
 
     def language_changed(self, language):
-        if self.toggle_button.isChecked():
-            self.translation_thread.stop_translation()
-            self.translation_thread.start_translation(language.lower())
+        # Applied between segments; speech during the switch is still translated
+        self.translation_thread.change_language(language.lower())
+
+    def update_status(self, status):
+        self.translation_view.set_status(status)
+        self.setWindowTitle(f"Speech Translation - {status}")
 
     def update_label(self, translation):
         try:
-            self.translation_label.setText(translation)
+            # Repaints are throttled inside the view
+            self.translation_view.add_caption(translation)
         except Exception as e:
             logger.error(f"Error updating label: {e}", exc_info=True)
 
     def closeEvent(self, event):
         if self.translation_thread:
-            self.translation_thread.stop_translation()
+            self.translation_thread.shutdown()
         super().closeEvent(event)
 
 def run_translation_window():